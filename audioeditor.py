@@ -1,13 +1,28 @@
-import wave
-import math
+import os
 import copy
+import math
 import numpy as np
 
+from sampleformat import sample_types, get_peak, bytes_to_samples, samples_to_bytes, samples_to_float, \
+    float_to_samples, get_converted_samples, milliseconds_to_frames
+from gain import db_to_gain, get_envelope, apply_gain
+from vocoder import PhaseVocoder, get_normalized
+from parallel import ParallelPhaseVocoder
+from resample import resample
+from pitch import get_pitch_factor, shift_pitch_values
+from loudness import Loudness, measure_loudness
+from silence import detect_silence, get_blocks, get_cut_points
+from mixer import TrackReader, Mixer, get_file_track_reader
+from cache import read_wav, get_cached, get_file_key
+from wavfile import WavWriter, WavUpdater, get_new_file_name, get_split_file_names
+from profiling import profiled
+
 
 class AudioEditor:
     def __init__(self, file_name):
         self.file_name = file_name
-        self.frames = None
+        self._samples = None
+        self._frames = None
 
         self.nchannels = None
         self.sampwidth = None
@@ -16,32 +31,49 @@ class AudioEditor:
         self.comptype = None
         self.compname = None
         self.peak = None
-        self.content = b''
-        self.types = None
+        self.types = sample_types
+        self.workers = 1
+        self.source_key = None
+        self.changed_regions = None
+        self.written_file = None
         self.set_parameters(file_name)
 
+    @property
+    def samples(self):
+        return self._samples
+
+    @samples.setter
+    def samples(self, samples):
+        self._samples = samples
+        self._frames = None
+        self.nframes = len(samples)
+        self.source_key = None
+        self.changed_regions = None
+
+    @property
+    def frames(self):
+        if self._frames is None:
+            content = self.content
+            frame_size = self.sampwidth * self.nchannels
+            self._frames = [content[i:i + frame_size] for i in range(0, len(content), frame_size)]
+        return self._frames
+
+    @frames.setter
+    def frames(self, frames):
+        self.samples = bytes_to_samples(b''.join(frames), self.sampwidth, self.nchannels)
+
+    @property
+    @profiled
+    def content(self):
+        return samples_to_bytes(self.samples, self.sampwidth)
+
+    @profiled
     def set_parameters(self, file_name):
-        wav = wave.open(file_name, mode="rb")
-        params = wav.getparams()
-        self.frames = self.get_frames(wav)
-        wav.setpos(0)
-        self.content = wav.readframes(wav.getnframes())
-        wav.close()
-        self.set_wav_params(params)
-        self.peak = 256 ** self.sampwidth / 2
-        self.types = {
-            1: np.int8,
-            2: np.int16,
-            4: np.int32
-        }
-
-    def get_frames(self, file):
-        frames = []
-        frame = file.readframes(1)
-        while frame != b'':
-            frames.append(frame)
-            frame = file.readframes(1)
-        return frames
+        wav_format, samples, source_key = read_wav(file_name)
+        self.set_wav_params(wav_format)
+        self.peak = get_peak(self.sampwidth)
+        self.samples = samples
+        self.source_key = source_key
 
     def set_wav_params(self, params):
         self.nchannels = params.nchannels
@@ -51,71 +83,109 @@ class AudioEditor:
         self.comptype = params.comptype
         self.compname = params.compname
 
+    @profiled
+    def convert(self, nchannels, sampwidth, matrix=None):
+        samples = get_converted_samples(self.samples, self.sampwidth, nchannels, sampwidth, matrix)
+        self.nchannels = nchannels
+        self.sampwidth = sampwidth
+        self.peak = get_peak(sampwidth)
+        self.samples = samples
+
     def add_channels_into_frames(self, count_of_channels):
-        self.nchannels += count_of_channels
-        while count_of_channels > 0:
-            new_frames = []
-            for frame in self.frames:
-                new_frame = frame + frame * (self.nchannels - 1)
-                new_frames.append(new_frame)
-            self.frames = new_frames
-            count_of_channels -= 1
+        self.convert(self.nchannels + count_of_channels, self.sampwidth)
 
     def extend_samples(self, sampwidth):
-        new_frames = []
-        self.sampwidth += sampwidth
-        for frame in self.frames:
-            new_frames.append(frame + b'\xff' * sampwidth)
-        self.frames = new_frames
+        self.convert(self.nchannels, self.sampwidth + sampwidth)
 
     def add_channels_and_extend_samples(self, other_audio):
-        if self.nchannels != max(self.nchannels, other_audio.nchannels):
-            difference_nchannels = max(self.nchannels, other_audio.nchannels) - self.nchannels
-            self.add_channels_into_frames(difference_nchannels)
-        if self.sampwidth != max(self.sampwidth, other_audio.sampwidth):
-            difference_sampwidth = max(self.sampwidth, other_audio.sampwidth) - self.sampwidth
-            self.extend_samples(difference_sampwidth)
+        self.convert(max(self.nchannels, other_audio.nchannels), max(self.sampwidth, other_audio.sampwidth))
 
+    @profiled
     def join(self, other_audio):
-        other_audio = AudioEditor(other_audio)
-        self.add_channels_and_extend_samples(other_audio)
-        copy_other_audio = copy.deepcopy(other_audio)
-        copy_other_audio.add_channels_and_extend_samples(self)
-        self.frames += copy_other_audio.frames
-        self.nframes = len(self.frames)
-
-    def split_and_write_result_in_new_files(self, position_in_milliseconds):
-        if position_in_milliseconds == 0:
-            return
-        new_frames = self.split_and_get_two_frames(position_in_milliseconds)
-        self.write_changes_to_two_new_file(new_frames)
+        wav_format, other_samples, _ = read_wav(other_audio)
+        nchannels = max(self.nchannels, wav_format.nchannels)
+        sampwidth = max(self.sampwidth, wav_format.sampwidth)
+        samples = np.empty((self.nframes + wav_format.nframes, nchannels), dtype=sample_types[sampwidth])
+        samples[:self.nframes] = get_converted_samples(self.samples, self.sampwidth, nchannels, sampwidth)
+        samples[self.nframes:] = get_converted_samples(other_samples, wav_format.sampwidth, nchannels, sampwidth)
+        self.nchannels = nchannels
+        self.sampwidth = sampwidth
+        self.peak = get_peak(sampwidth)
+        self.samples = samples
+
+    @profiled
+    def mix(self, tracks, limit_in_dB=-1.0, block_size=2 ** 16):
+        samples = self.samples
+        track_reader = TrackReader(lambda start, end: samples[start:end], self.nchannels, self.sampwidth,
+                                   self.framerate, self.nframes)
+        mixer = Mixer([track_reader] + [get_file_track_reader(track) for track in tracks], limit_in_dB, block_size)
+        mixed_samples = np.empty((mixer.nframes, mixer.nchannels), dtype=sample_types[mixer.sampwidth])
+        position = 0
+        for block in mixer.get_blocks():
+            mixed_samples[position:position + len(block)] = block
+            position += len(block)
+        self.nchannels = mixer.nchannels
+        self.sampwidth = mixer.sampwidth
+        self.peak = get_peak(mixer.sampwidth)
+        self.samples = mixed_samples
+
+    def get_frame_position(self, position_in_milliseconds):
+        return min(max(milliseconds_to_frames(position_in_milliseconds, self.framerate), 0), self.nframes)
+
+    def get_region(self, start_in_milliseconds=None, end_in_milliseconds=None):
+        start = 0 if start_in_milliseconds is None else self.get_frame_position(start_in_milliseconds)
+        end = self.nframes if end_in_milliseconds is None else self.get_frame_position(end_in_milliseconds)
+        return start, max(start, end)
+
+    def is_whole_file(self, start, end):
+        return start == 0 and end == self.nframes
+
+    def write_region(self, start, samples):
+        if not self.samples.flags.writeable:
+            self._samples = np.array(self.samples)
+        self.samples[start:start + len(samples)] = samples
+        self._frames = None
+        self.source_key = None
+        if self.changed_regions is not None:
+            self.changed_regions.append((start, start + len(samples)))
+
+    @profiled
+    def split_and_write_result_in_new_files(self, positions_in_milliseconds):
+        new_frames = self.split_and_get_frames(positions_in_milliseconds)
+        if len(new_frames) > 1:
+            self.write_changes_to_new_files(new_frames)
+
+    def get_silent_regions(self, threshold_in_dB=-40, min_silence_in_milliseconds=500, envelope='rms'):
+        return detect_silence(get_blocks(self.samples), self.sampwidth, self.framerate, threshold_in_dB,
+                              min_silence_in_milliseconds, envelope=envelope)
+
+    def split_on_silence(self, threshold_in_dB=-40, min_silence_in_milliseconds=500, envelope='rms'):
+        regions = self.get_silent_regions(threshold_in_dB, min_silence_in_milliseconds, envelope)
+        positions = [position * 1000 / self.framerate for position in get_cut_points(regions, self.nframes)]
+        self.split_and_write_result_in_new_files(positions)
+        return positions
+
+    def split_and_get_frames(self, positions_in_milliseconds):
+        positions = {self.get_frame_position(position) for position in np.atleast_1d(positions_in_milliseconds)}
+        bounds = [0] + sorted(positions - {0, self.nframes}) + [self.nframes]
+        return [self.samples[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
 
     def split_and_get_two_frames(self, position_in_milliseconds):
-        new_frames = []
-        frames = []
-        for i in range(len(self.frames)):
-            if (i / self.framerate) * 1000 == position_in_milliseconds:
-                new_frames.append(frames)
-                frames = []
-            frames.append(self.frames[i])
-        new_frames.append(frames)
-        return new_frames
+        return self.split_and_get_frames([position_in_milliseconds])
 
-    def write_changes_to_two_new_file(self, new_frames):
-        file_names = ['first_splitting_' + self.file_name, 'second_splitting_' + self.file_name]
+    def write_changes_to_new_files(self, new_frames):
+        file_names = get_split_file_names(self.file_name, len(new_frames))
         for i in range(len(new_frames)):
-            frames = b''.join(new_frames[i])
-            new_file = wave.open(file_names[i], mode="wb")
-            self.set_params_for_new_file_for_split(new_file, len(new_frames[i]))
-            new_file.writeframes(frames)
-            new_file.close()
+            self.write_samples_to_new_file(file_names[i], new_frames[i])
+
+    def write_changes_to_two_new_file(self, new_frames):
+        self.write_changes_to_new_files(new_frames)
 
-    def set_params_for_new_file_for_split(self, new_file, nframe):
-        new_file.setcomptype(self.comptype, self.compname)
-        new_file.setframerate(self.framerate)
-        new_file.setnchannels(self.nchannels)
-        new_file.setsampwidth(self.sampwidth)
-        new_file.setnframes(nframe)
+    @profiled
+    def write_samples_to_new_file(self, new_name, samples):
+        new_file = WavWriter(new_name, self.nchannels, self.sampwidth, self.framerate, len(samples))
+        new_file.write(0, samples)
+        new_file.close()
 
     def get_separated_frame_in_samples(self, frame):
         samples = []
@@ -128,7 +198,7 @@ class AudioEditor:
         return samples
 
     def sample_to_int(self, sample):
-        return np.fromstring(sample, dtype=self.types[self.sampwidth])
+        return int(bytes_to_samples(sample, self.sampwidth, 1)[0, 0])
 
     def calculate_dB_and_sign(self, sample_converted_to_int, dB, sign):
         if sample_converted_to_int == 0:
@@ -154,19 +224,33 @@ class AudioEditor:
 
     def content_to_int_and_get_converted_channels_of_samples(self):
         converted_channel = []
-        samples = np.fromstring(self.content, dtype=self.types[self.sampwidth])
         for n in range(self.nchannels):
-            converted_channel.append(samples[n::self.nchannels])
+            converted_channel.append(self.samples[:, n])
         return converted_channel
 
-    def change_temp_for_each_channel_and_get_samples(self, factor, window_size, h):
-        converted_channels_of_samples = self.content_to_int_and_get_converted_channels_of_samples()
+    @profiled
+    def change_temp_for_each_channel_and_get_samples(self, factor, window_size, h, converted_channels_of_samples=None):
+        if converted_channels_of_samples is not None or self.source_key is None:
+            if converted_channels_of_samples is None:
+                converted_channels_of_samples = self.content_to_int_and_get_converted_channels_of_samples()
+            return self.change_temp_for_channels_and_get_samples(converted_channels_of_samples, factor, window_size, h)
+        result = get_cached(self.source_key, 'temp {} {} {}'.format(factor, window_size, h),
+                            lambda: np.column_stack(self.change_temp_for_channels_and_get_samples(
+                                self.content_to_int_and_get_converted_channels_of_samples(), factor, window_size, h)))
+        return [result[:, n] for n in range(result.shape[1])]
+
+    def change_temp_for_channels_and_get_samples(self, converted_channels_of_samples, factor, window_size, h):
+        if self.workers > 1:
+            vocoder = ParallelPhaseVocoder(factor, window_size, h, self.workers)
+            return [get_normalized(result, result.max())
+                    for result in vocoder.change_temp_for_each_channel(converted_channels_of_samples)]
         new_converted_channels = []
         for converted_sample in converted_channels_of_samples:
             new_converted_channels.append(self.change_temp_for_one_channel_and_get_samples(converted_sample,
                                                                                            factor, window_size, h))
         return new_converted_channels
 
+    @profiled
     def channels_to_bytes(self, channels_in_int):
         new_bytes_channels = []
         for k in range(len(channels_in_int)):
@@ -175,6 +259,7 @@ class AudioEditor:
                 new_bytes_channels[k].append(self.int_to_bytes(sample))
         return new_bytes_channels
 
+    @profiled
     def get_different_channels_to_frames(self, new_bytes_channels):
         new_frames = []
         for i in range(len(new_bytes_channels[0])):
@@ -184,59 +269,90 @@ class AudioEditor:
             new_frames.append(sample)
         return new_frames
 
+    @profiled
     def change_temp(self, factor, window_size=2**13, h=2**11):
         if factor == 1:
             return
         new_converted_channels = self.change_temp_for_each_channel_and_get_samples(factor, window_size, h)
-        new_bytes_channels = self.channels_to_bytes(new_converted_channels)
-        self.frames = self.get_different_channels_to_frames(new_bytes_channels)
-        self.nframes = len(self.frames)
+        self.samples = float_to_samples(np.column_stack(new_converted_channels), self.sampwidth)
 
-    def change_pitch(self, pitch_in_semitone, window_size=2 ** 13, h=2 ** 11):
-        if pitch_in_semitone < -12 or pitch_in_semitone > 12:
+    @profiled
+    def change_pitch(self, pitch_in_semitone, window_size=2 ** 13, h=2 ** 11, quality='linear',
+                     start_in_milliseconds=None, end_in_milliseconds=None):
+        if pitch_in_semitone == 0 or pitch_in_semitone < -12 or pitch_in_semitone > 12:
             return
-        factor = 2 ** (1.0 * pitch_in_semitone / 12.0)
-        self.change_temp(1.0 / factor, window_size, h)
-        self.frames = self.frames[window_size:]
-        self.change_speed(factor)
-
-    def get_spectra_of_windows(self, content, start, end, hanning_window):
-        part_of_content = content[int(start):int(end)]
-        return np.fft.fft(hanning_window * part_of_content)
+        start, end = self.get_region(start_in_milliseconds, end_in_milliseconds)
+        if not self.is_whole_file(start, end):
+            self.change_pitch_in_region(pitch_in_semitone, window_size, h, quality, start, end)
+            return
+        values = shift_pitch_values(samples_to_float(self.samples, self.sampwidth),
+                                    get_pitch_factor(pitch_in_semitone), window_size, h, quality)
+        self.samples = float_to_samples(np.round(values), self.sampwidth)
+
+    def change_pitch_in_region(self, pitch_in_semitone, window_size, h, quality, start, end):
+        margin = window_size + h
+        region = copy.copy(self)
+        region.samples = self.samples[max(start - margin, 0):end + margin]
+        region.change_pitch(pitch_in_semitone, window_size, h, quality)
+        offset = start - max(start - margin, 0)
+        self.write_region(start, region.samples[offset:offset + end - start])
 
     def change_temp_for_one_channel_and_get_samples(self, content, factor, window_size, h):
-        phase = np.zeros(window_size)
-        hanning_window = np.hanning(window_size)
-        result = np.zeros(int(len(content) / factor) + window_size)
-
-        for i in np.arange(0, len(content) - (window_size + h), h * factor):
-            first_spectra, second_spectra = self.get_spectra_of_two_consecutive_windows(content, h, i,
-                                                                                        window_size, hanning_window)
-            phase = self.get_rephased_all_frequencies(first_spectra, phase, second_spectra)
-            second_spectra_rephased = np.fft.ifft(np.abs(second_spectra) * np.exp(1j * phase))
-            i2 = int(i / factor)
-            result[i2: i2 + window_size] += hanning_window * second_spectra_rephased.real
-
-        result = ((2 ** (16 - 4)) * result / result.max())
-        return result
-
-    def get_rephased_all_frequencies(self, first_spectra, phase, second_spectra):
-        phase = (phase + np.angle(second_spectra) - np.angle(first_spectra)) % 2 * np.pi
-        return phase
-
-    def get_spectra_of_two_consecutive_windows(self, content, h, i, window_size, hanning_window):
-        first_spectra = self.get_spectra_of_windows(content, i, i + window_size, hanning_window)
-        second_spectra = self.get_spectra_of_windows(content, i + h, i + window_size + h, hanning_window)
-        return first_spectra, second_spectra
-
-    def change_volume(self, volume_in_dB):
-        if volume_in_dB == 0:
+        vocoder = PhaseVocoder(factor, window_size, h)
+        result = np.concatenate((vocoder.process(content), vocoder.flush()))
+        return get_normalized(result, result.max())
+
+    @profiled
+    def change_volume(self, volume_in_dB, start_in_milliseconds=None, end_in_milliseconds=None):
+        if np.all(np.asarray(volume_in_dB) == 0):
             return
-        new_frames = []
-        for frame in self.frames:
-            new_frame = self.change_volume_for_one_frame(frame, volume_in_dB)
-            new_frames.append(new_frame)
-        self.frames = new_frames
+        start, end = self.get_region(start_in_milliseconds, end_in_milliseconds)
+        samples = apply_gain(self.samples[start:end], db_to_gain(volume_in_dB), self.sampwidth)
+        if self.is_whole_file(start, end):
+            self.samples = samples
+        else:
+            self.write_region(start, samples)
+
+    @profiled
+    def change_volume_by_envelope(self, breakpoints, start_in_milliseconds=None, end_in_milliseconds=None):
+        start, end = self.get_region(start_in_milliseconds, end_in_milliseconds)
+        envelope = get_envelope(breakpoints, end - start, self.framerate, start)
+        samples = apply_gain(self.samples[start:end], envelope, self.sampwidth)
+        if self.is_whole_file(start, end):
+            self.samples = samples
+        else:
+            self.write_region(start, samples)
+
+    def fade_in(self, duration_in_milliseconds):
+        self.change_volume_by_envelope([(0, -np.inf), (duration_in_milliseconds, 0)], 0, duration_in_milliseconds)
+
+    def fade_out(self, duration_in_milliseconds):
+        end = self.nframes / self.framerate * 1000
+        self.change_volume_by_envelope([(end - duration_in_milliseconds, 0), (end, -np.inf)],
+                                       end - duration_in_milliseconds)
+
+    @profiled
+    def get_loudness(self):
+        loudness = get_cached(self.source_key, 'loudness',
+                              lambda: np.array(measure_loudness(self.samples, self.sampwidth, self.framerate)))
+        return Loudness(*np.asarray(loudness).tolist())
+
+    def get_normalization_gain(self, target_lufs=None, target_peak=None):
+        if target_lufs is None and target_peak is None:
+            raise ValueError('Target loudness (LUFS) or target peak (dBFS) is required')
+        loudness = self.get_loudness()
+        gains = []
+        if target_lufs is not None:
+            gains.append(target_lufs - loudness.integrated)
+        if target_peak is not None:
+            gains.append(target_peak - loudness.peak)
+        return min(gains)
+
+    @profiled
+    def normalize(self, target_lufs=None, target_peak=None):
+        volume_in_dB = self.get_normalization_gain(target_lufs, target_peak)
+        if np.isfinite(volume_in_dB):
+            self.change_volume(volume_in_dB)
 
     def change_volume_for_one_frame(self, frame, volume_in_dB):
         new_frame = b''
@@ -254,37 +370,27 @@ class AudioEditor:
             new_frame += self.int_to_bytes(new_sample_converted_in_int)
         return new_frame
 
-    def change_speed(self, factor):
+    @profiled
+    def change_speed(self, factor, quality='linear'):
         if factor == 1:
             return
-        future_count_of_frames = round(len(self.frames) / factor)
-        count_of_groups = abs(len(self.frames) - future_count_of_frames)
-        count_of_frames_in_groups = round(len(self.frames) / count_of_groups)
-        new_frames = []
-        i = 1
-        for frame in self.frames:
-            if i % count_of_frames_in_groups == 0:
-                if factor > 1:
-                    i += 1
-                    continue
-                else:
-                    new_frames.append(frame)
-            new_frames.append(frame)
-            i += 1
-        self.frames = new_frames
-        self.nframes = len(new_frames)
-
-    def write_changes_to_new_file(self):
-        new_name = 'changing_' + self.file_name
-        frames = b''.join(self.frames)
-        new_file = wave.open(new_name, mode="wb")
-        self.set_params_for_new_file(new_file)
-        new_file.writeframes(frames)
-        new_file.close()
-
-    def set_params_for_new_file(self, new_file):
-        new_file.setcomptype(self.comptype, self.compname)
-        new_file.setframerate(self.framerate)
-        new_file.setnchannels(self.nchannels)
-        new_file.setsampwidth(self.sampwidth)
-        new_file.setnframes(self.nframes)
+        self.samples = resample(self.samples, factor, self.sampwidth, quality)
+
+    @profiled
+    def write_changes_to_new_file(self, new_name=None):
+        if new_name is None:
+            new_name = get_new_file_name(self.file_name, 'changing_')
+        if self.can_update(new_name):
+            new_file = WavUpdater(new_name)
+            for start, end in self.changed_regions:
+                new_file.write(start, self.samples[start:end])
+            new_file.close()
+        else:
+            self.write_samples_to_new_file(new_name, self.samples)
+        self.written_file = (new_name, get_file_key(new_name))
+        self.changed_regions = []
+
+    def can_update(self, new_name):
+        return (self.changed_regions is not None and self.written_file is not None and
+                self.written_file[0] == new_name and os.path.exists(new_name) and
+                self.written_file[1] == get_file_key(new_name))
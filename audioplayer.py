@@ -1,62 +1,75 @@
 import pyaudio
-import wave
-import time
 import sys
 import os
 import argparse
 import threading
-from PyQt5.QtCore import QSize
+from PyQt5.QtCore import QSize, QTimer
 from PyQt5.Qt import Qt
 from PyQt5.QtWidgets import QApplication, QLabel, QWidget, QMainWindow, QPushButton
 from PyQt5.QtGui import QPixmap
 
 from playerbutton import PlayerButton
+from waveformwidget import WaveformWidget
+from playback import PlaybackEngine, StreamSource, get_source
+from peaks import get_peak_index
 
 
 class AudioPlayer(QMainWindow):
-    def __init__(self, file_name, removed):
+    def __init__(self, source, removed=False, buffer_frames=2 ** 16, latency=0.05):
         super().__init__()
-        self.file_name = file_name
+        self.file_name = source if isinstance(source, str) else None
         self.removed = removed
         self.height = 768
         self.width = 1366
-        self.wav_file = wave.open(file_name, "rb")
+        self.engine = PlaybackEngine(get_source(source), buffer_frames, latency)
+        self.engine.start()
         self.p = pyaudio.PyAudio()
-        self.stream = self.p.open(format=self.p.get_format_from_width(self.wav_file.getsampwidth()),
-                                  channels=self.wav_file.getnchannels(),
-                                  rate=self.wav_file.getframerate(),
+        self.stream = self.p.open(format=self.p.get_format_from_width(self.engine.source.sampwidth),
+                                  channels=self.engine.source.nchannels,
+                                  rate=self.engine.source.framerate,
                                   output=True,
+                                  frames_per_buffer=self.engine.frames_per_buffer,
                                   stream_callback=self.callback,
                                   start=False)
-        self.central_widget = CentralWidget(self, self.wav_file, self.stream, (self.width, self.height))
+        self.central_widget = CentralWidget(self, self.engine, self.stream, (self.width, self.height))
         self.setCentralWidget(self.central_widget)
         self.setGeometry(0, 25,
                          self.width,
                          self.height)
 
     def callback(self, in_data, frame_count, time_info, status):
-        data = self.wav_file.readframes(frame_count)
+        data = self.engine.read(frame_count)
+        if self.engine.is_finished():
+            return data, pyaudio.paComplete
         return data, pyaudio.paContinue
 
     def closeEvent(self, QCloseEvent):
         self.stream.stop_stream()
         self.stream.close()
         self.p.terminate()
-        self.wav_file.close()
-        if self.removed:
+        self.engine.stop()
+        if self.removed and self.file_name is not None:
             os.remove(self.file_name)
 
 
 class CentralWidget(QWidget):
-    def __init__(self, parent, wav_file, stream, size_window):
+    def __init__(self, parent, engine, stream, size_window):
         super().__init__(parent)
-        self.wav_file = wav_file
+        self.engine = engine
         self.size_window = size_window
         self.stream = stream
 
         self.background = QLabel(self)
         self.set_background('фон.jpg')
 
+        self.waveform = None
+        if not isinstance(engine.source, StreamSource):
+            self.waveform = WaveformWidget(self, get_peak_index(engine.source), (0, 50, size_window[0], 400))
+            self.waveform.seeked.connect(self.engine.seek)
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(lambda: self.waveform.set_position(self.engine.position))
+            self.timer.start(50)
+
         self.play_button = PlayerButton(self, (3, 3.5), 150, 'play.png')
         self.play_button.clicked.connect(self.play)
 
@@ -76,10 +89,9 @@ class CentralWidget(QWidget):
 
     def check(self):
         while True:
-            while self.wav_file.tell() != self.wav_file.getnframes():
-                time.sleep(0.1)
+            self.engine.finished.wait()
             self.stream.stop_stream()
-            self.wav_file.rewind()
+            self.engine.rewind()
 
     def play(self):
         self.stream.start_stream()
@@ -97,12 +109,22 @@ def get_argparse():
         type=str,
         default='обычный.wav',
         help='Name of wav file')
+    arg.add_argument(
+        '--buffer-frames',
+        type=int,
+        default=2 ** 16,
+        help='Count of frames preloaded into the playback buffer')
+    arg.add_argument(
+        '--latency',
+        type=float,
+        default=0.05,
+        help='Target output latency in seconds')
     return arg.parse_args()
 
 
 if __name__ == "__main__":
     arguments = get_argparse()
     app = QApplication(sys.argv)
-    ex = AudioPlayer(arguments.file)
+    ex = AudioPlayer(arguments.file, False, arguments.buffer_frames, arguments.latency)
     ex.show()
     sys.exit(app.exec_())
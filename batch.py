@@ -0,0 +1,201 @@
+import os
+import csv
+import glob
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from audioeditor import AudioEditor
+from render import RenderGraph
+
+
+operation_names = ['speed', 'temp', 'pitch', 'volume', 'loudness']
+MEMORY_PER_BYTE_OF_FILE = 16
+
+
+def get_argparse():
+    arg = argparse.ArgumentParser(
+        description=" %(prog)s обрабатывает много wav файлов одной цепочкой команд в нескольких процессах "
+        "без аудиоплеера.")
+    arg.add_argument(
+        'patterns',
+        type=str,
+        nargs='*',
+        help='Glob patterns of wav files')
+    arg.add_argument(
+        '--manifest',
+        '-m',
+        type=str,
+        help='CSV or JSONL file with columns file, speed, temp, pitch, volume, loudness and optional output')
+    arg.add_argument(
+        '--output-dir',
+        '-o',
+        type=str,
+        required=True,
+        help='Directory for processed files')
+    arg.add_argument(
+        "--speed",
+        "-s",
+        type=float,
+        help='Speed by a factor with change of a pitch')
+    arg.add_argument(
+        "--temp",
+        "-t",
+        type=float,
+        help='Speed by a factor without change of a pitch')
+    arg.add_argument(
+        "--pitch",
+        "-p",
+        type=float,
+        help='Pitch in semitone')
+    arg.add_argument(
+        "--volume",
+        "-v",
+        type=float,
+        help='How much volume (in dB) will add')
+    arg.add_argument(
+        "--loudness",
+        "-l",
+        type=float,
+        help='Normalize to the integrated loudness (in LUFS, ITU-R BS.1770)')
+    arg.add_argument(
+        "--quality",
+        "-q",
+        type=str,
+        default='linear',
+        choices=['nearest', 'linear', 'sinc'],
+        help='Resampling quality for speed and pitch changing')
+    arg.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count(),
+        help='Count of processes (count of CPUs by default)')
+    arg.add_argument(
+        "--memory-limit",
+        type=int,
+        default=1024,
+        help='Estimated memory (in MB) of files processed at the same time')
+    arg.add_argument(
+        "--report",
+        "-r",
+        type=str,
+        help='Name of JSON file for the per-file report')
+    return arg.parse_args()
+
+
+def get_operations(row):
+    return [(name, float(row[name])) for name in operation_names if row.get(name) not in (None, '')]
+
+
+def read_manifest(file_name):
+    with open(file_name, newline='', encoding='utf-8') as file:
+        if file_name.endswith('.jsonl'):
+            rows = [json.loads(line) for line in file if line.strip()]
+        else:
+            rows = list(csv.DictReader(file))
+    return [(row['file'], get_operations(row), row.get('output') or None) for row in rows]
+
+
+def get_jobs(patterns, manifest, operations, output_dir):
+    jobs = []
+    for pattern in patterns:
+        jobs += [(file_name, operations, None) for file_name in sorted(glob.glob(pattern))]
+    if manifest is not None:
+        jobs += read_manifest(manifest)
+    jobs = [(file_name, job_operations, os.path.join(output_dir, output or os.path.basename(file_name)))
+            for file_name, job_operations, output in jobs]
+    counts = Counter(os.path.normpath(new_name) for _, _, new_name in jobs)
+    collisions = sorted(new_name for new_name, count in counts.items() if count > 1)
+    if collisions:
+        raise ValueError('Several files would be written to {}, use output in a manifest to rename them'.format(
+            ', '.join(collisions)))
+    return jobs
+
+
+def get_estimated_memory(file_name):
+    try:
+        return os.path.getsize(file_name) * MEMORY_PER_BYTE_OF_FILE
+    except OSError:
+        return 0
+
+
+def process_file(file_name, operations, new_name, quality='linear'):
+    start = time.perf_counter()
+    try:
+        render_graph = RenderGraph(AudioEditor(file_name))
+        for name, value in operations:
+            if name in ('speed', 'pitch'):
+                getattr(render_graph, 'change_' + name)(value, quality=quality)
+            elif name == 'loudness':
+                render_graph.normalize(value)
+            else:
+                getattr(render_graph, 'change_' + name)(value)
+        render_graph.write_changes_to_new_file(new_name)
+        error = None
+    except Exception as exception:
+        error = get_error(exception)
+    return get_result(file_name, new_name, start, error)
+
+
+def get_error(exception):
+    return '{}: {}'.format(type(exception).__name__, exception)
+
+
+def get_result(file_name, new_name, start, error):
+    return {'file': file_name, 'output': new_name, 'seconds': time.perf_counter() - start, 'error': error}
+
+
+def run_jobs(jobs, quality='linear', count_of_processes=None, memory_limit=2 ** 30):
+    results = [None] * len(jobs)
+    memory = [get_estimated_memory(file_name) for file_name, _, _ in jobs]
+    starts = [None] * len(jobs)
+    position = 0
+    running = {}
+    executor = ProcessPoolExecutor(max_workers=count_of_processes)
+    try:
+        while position < len(jobs) or running:
+            while position < len(jobs) and (not running or sum(memory[i] for i in running.values()) +
+                                            memory[position] <= memory_limit):
+                file_name, operations, new_name = jobs[position]
+                starts[position] = time.perf_counter()
+                running[executor.submit(process_file, file_name, operations, new_name, quality)] = position
+                position += 1
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            is_broken = False
+            for future in done:
+                i = running.pop(future)
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool as exception:
+                    results[i] = get_result(jobs[i][0], jobs[i][2], starts[i], get_error(exception))
+                    is_broken = True
+            if is_broken:
+                executor.shutdown()
+                executor = ProcessPoolExecutor(max_workers=count_of_processes)
+    finally:
+        executor.shutdown()
+    return results
+
+
+def print_report(results):
+    for result in results:
+        print('{:<50}{:>10.3f} s  {}'.format(result['file'], result['seconds'], result['error'] or 'ok'))
+    failures = [result for result in results if result['error']]
+    print('{} files, {} failed, {:.3f} s in total'.format(len(results), len(failures),
+                                                          sum(result['seconds'] for result in results)))
+
+
+if __name__ == '__main__':
+    arguments = get_argparse()
+    chain = get_operations({name: getattr(arguments, name) for name in operation_names})
+    os.makedirs(arguments.output_dir, exist_ok=True)
+    job_results = run_jobs(get_jobs(arguments.patterns, arguments.manifest, chain, arguments.output_dir),
+                           arguments.quality, arguments.jobs, arguments.memory_limit * 2 ** 20)
+    print_report(job_results)
+    if arguments.report is not None:
+        with open(arguments.report, 'w', encoding='utf-8') as report:
+            json.dump(job_results, report, ensure_ascii=False, indent=4)
@@ -0,0 +1,196 @@
+import os
+import copy
+import sys
+import time
+import shutil
+import tracemalloc
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+from audioeditor import AudioEditor
+from gain import db_to_gain, get_envelope, apply_gain
+from vocoder import PhaseVocoder, stretch_hop_by_hop
+from stream import StreamEditor
+from pitch import get_pitch_factor, shift_pitch_values
+from sampleformat import samples_to_float, float_to_samples
+from mixer import MixTrack, mix_files
+from playback import PlaybackEngine, FileSource, get_source
+
+
+def get_argparse():
+    arg = argparse.ArgumentParser(
+        description=" %(prog)s измеряет скорость работы операций аудиоредактора (в сэмплах в секунду).")
+    arg.add_argument(
+        '--file',
+        '-f',
+        type=str,
+        default='обычный.wav',
+        help='Name of wav file')
+    arg.add_argument(
+        '--frames',
+        '-n',
+        type=int,
+        default=20000,
+        help='Count of frames processed by the frame-by-frame implementation')
+    arg.add_argument(
+        '--repeat',
+        '-r',
+        type=int,
+        default=5,
+        help='Count of runs, the best time is reported')
+    return arg.parse_args()
+
+
+def measure(function, repeat):
+    best_time = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time
+
+
+def print_throughput(name, count_of_samples, seconds):
+    print('{:<40}{:>16.0f} samples/s'.format(name, count_of_samples / seconds))
+
+
+def benchmark_change_volume(audio_editor, count_of_frames, repeat):
+    frames = audio_editor.frames[:count_of_frames]
+    count_of_samples = audio_editor.samples.size
+    gain = db_to_gain(10)
+    channel_gains = db_to_gain([10] * audio_editor.nchannels)
+    envelope = get_envelope([(0, -60), (audio_editor.nframes / audio_editor.framerate * 1000, 10)],
+                            audio_editor.nframes, audio_editor.framerate)
+
+    frame_by_frame_time = measure(lambda: [audio_editor.change_volume_for_one_frame(frame, 10) for frame in frames], 1)
+    vectorized_time = measure(lambda: apply_gain(audio_editor.samples, gain, audio_editor.sampwidth), repeat)
+    print_throughput('change_volume (frame by frame)', len(frames) * audio_editor.nchannels, frame_by_frame_time)
+    print_throughput('change_volume (vectorized)', count_of_samples, vectorized_time)
+    print_throughput('change_volume (per-channel gains)', count_of_samples,
+                     measure(lambda: apply_gain(audio_editor.samples, channel_gains, audio_editor.sampwidth), repeat))
+    print_throughput('change_volume_by_envelope', count_of_samples,
+                     measure(lambda: apply_gain(audio_editor.samples, envelope, audio_editor.sampwidth), repeat))
+    print('speedup: {:.0f}x'.format(frame_by_frame_time / len(frames) / (vectorized_time / audio_editor.nframes)))
+
+
+def change_temp(content, factor, window_size, h):
+    vocoder = PhaseVocoder(factor, window_size, h)
+    return np.concatenate((vocoder.process(content), vocoder.flush()))
+
+
+def benchmark_change_temp(audio_editor, repeat, factor=0.7, window_size=2 ** 13, h=2 ** 11):
+    content = audio_editor.content_to_int_and_get_converted_channels_of_samples()[0].astype(float)
+    hop_by_hop_time = measure(lambda: stretch_hop_by_hop(content, factor, window_size, h), repeat)
+    batched_time = measure(lambda: change_temp(content, factor, window_size, h), repeat)
+    print_throughput('change_temp (hop by hop)', len(content), hop_by_hop_time)
+    print_throughput('change_temp (batched real FFT)', len(content), batched_time)
+    print('speedup: {:.1f}x'.format(hop_by_hop_time / batched_time))
+
+
+def shift_pitch_with_temp_and_speed(audio_editor, factor, window_size, h):
+    two_stages = copy.copy(audio_editor)
+    two_stages.change_temp(1 / factor, window_size, h)
+    two_stages.samples = two_stages.samples[window_size:]
+    two_stages.change_speed(factor)
+    return two_stages.samples
+
+
+def shift_pitch_in_one_pass(audio_editor, factor, window_size, h, phase_locking=True):
+    values = shift_pitch_values(samples_to_float(audio_editor.samples, audio_editor.sampwidth), factor, window_size, h,
+                                phase_locking=phase_locking)
+    return float_to_samples(np.round(values), audio_editor.sampwidth)
+
+
+def benchmark_change_pitch(audio_editor, repeat, window_size=2 ** 13, h=2 ** 11):
+    count_of_samples = audio_editor.samples.size
+    for pitch_in_semitone in [-12, -3, -1, 1, 3, 12]:
+        factor = get_pitch_factor(pitch_in_semitone)
+        two_stages_time = measure(lambda: shift_pitch_with_temp_and_speed(audio_editor, factor, window_size, h),
+                                  repeat)
+        single_pass_time = measure(lambda: shift_pitch_in_one_pass(audio_editor, factor, window_size, h), repeat)
+        unlocked_time = measure(lambda: shift_pitch_in_one_pass(audio_editor, factor, window_size, h, False), repeat)
+        print_throughput('pitch {:+d} (change_temp + change_speed)'.format(pitch_in_semitone), count_of_samples,
+                         two_stages_time)
+        print_throughput('pitch {:+d} (single pass)'.format(pitch_in_semitone), count_of_samples, single_pass_time)
+        print_throughput('pitch {:+d} (single pass, no locking)'.format(pitch_in_semitone), count_of_samples,
+                         unlocked_time)
+        print('speedup: {:.1f}x, {:.1f}x without locking'.format(two_stages_time / single_pass_time,
+                                                                  two_stages_time / unlocked_time))
+
+
+def run_main(*arguments):
+    subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')] +
+                   list(arguments), check=True, stdout=subprocess.DEVNULL)
+
+
+def benchmark_cold_start(file_name, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        copy_name = shutil.copy(file_name, directory)
+        interpreter_time = measure(lambda: subprocess.run([sys.executable, '-c', 'pass'], check=True), repeat)
+        help_time = measure(lambda: run_main('--help'), repeat)
+        volume_time = measure(lambda: run_main('-f', copy_name, '-v', '3', '--no-play'), repeat)
+    print('{:<40}{:>16.3f} s'.format('python (empty interpreter)', interpreter_time))
+    print('{:<40}{:>16.3f} s'.format('main.py --help', help_time))
+    print('{:<40}{:>16.3f} s'.format('main.py -v 3 --no-play', volume_time))
+
+
+def start_playback(source):
+    engine = PlaybackEngine(source)
+    engine.start()
+    engine.stop()
+
+
+def play_through_file(file_name, new_name):
+    stream_editor = StreamEditor(file_name)
+    stream_editor.change_volume(3)
+    stream_editor.write_changes_to_new_file(new_name)
+    start_playback(FileSource(new_name))
+
+
+def play_from_memory(file_name):
+    stream_editor = StreamEditor(file_name)
+    stream_editor.change_volume(3)
+    start_playback(get_source(stream_editor))
+
+
+def benchmark_first_sound(file_name, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        file_time = measure(lambda: play_through_file(file_name, os.path.join(directory, 'new.wav')), repeat)
+    print('{:<40}{:>16.3f} s'.format('first sound (through a temp file)', file_time))
+    print('{:<40}{:>16.3f} s'.format('first sound (from memory)', measure(lambda: play_from_memory(file_name),
+                                                                          repeat)))
+
+
+def measure_mix(tracks, new_name):
+    tracemalloc.start()
+    start = time.perf_counter()
+    mix_files(tracks, new_name)
+    seconds = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak_memory
+
+
+def benchmark_mix(audio_editor, repeat, counts_of_tracks=(2, 4, 8, 16, 32, 64)):
+    with tempfile.TemporaryDirectory() as directory:
+        new_name = os.path.join(directory, 'mix.wav')
+        for count_of_tracks in counts_of_tracks:
+            tracks = [MixTrack(audio_editor.file_name, -6, i * 100) for i in range(count_of_tracks)]
+            seconds, peak_memory = min(measure_mix(tracks, new_name) for _ in range(repeat))
+            print_throughput('mix ({} tracks)'.format(count_of_tracks), audio_editor.samples.size * count_of_tracks,
+                             seconds)
+            print('{:<40}{:>16.1f} MB'.format('peak memory', peak_memory / 2 ** 20))
+
+
+if __name__ == '__main__':
+    arguments = get_argparse()
+    audio_editor = AudioEditor(arguments.file)
+    benchmark_change_volume(audio_editor, arguments.frames, arguments.repeat)
+    benchmark_change_temp(audio_editor, arguments.repeat)
+    benchmark_change_pitch(audio_editor, arguments.repeat)
+    benchmark_cold_start(arguments.file, arguments.repeat)
+    benchmark_first_sound(arguments.file, arguments.repeat)
+    benchmark_mix(audio_editor, arguments.repeat)
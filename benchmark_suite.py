@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+from multiprocessing import Pool
+
+import numpy as np
+
+from audioeditor import AudioEditor
+from sampleformat import float32_to_samples
+from wavfile import WavWriter
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+channel_names = {1: 'mono', 2: 'stereo', 6: '5.1'}
+operations = ['load', 'change_volume', 'change_speed', 'change_temp', 'change_pitch', 'join', 'split', 'write']
+
+
+def get_argparse():
+    arg = argparse.ArgumentParser(
+        description=" %(prog)s измеряет скорость работы всех операций аудиоредактора на синтетических wav файлах "
+        "разных форматов и длительностей и сравнивает результаты с предыдущим запуском.")
+    arg.add_argument(
+        '--channels',
+        '-c',
+        type=int,
+        nargs='+',
+        default=[1, 2, 6],
+        help='Counts of channels of generated files')
+    arg.add_argument(
+        '--sampwidths',
+        '-w',
+        type=int,
+        nargs='+',
+        default=[1, 2, 3, 4],
+        help='Sample widths (in bytes) of generated files')
+    arg.add_argument(
+        '--durations',
+        '-d',
+        type=float,
+        nargs='+',
+        default=[10, 60],
+        help='Durations (in seconds) of generated files, for example 10 60 600 3600')
+    arg.add_argument(
+        '--operations',
+        '-op',
+        type=str,
+        nargs='+',
+        default=operations,
+        choices=operations,
+        help='Measured operations')
+    arg.add_argument(
+        '--framerate',
+        type=int,
+        default=44100,
+        help='Frame rate of generated files')
+    arg.add_argument(
+        '--repeat',
+        '-r',
+        type=int,
+        default=1,
+        help='Count of runs, the best time is reported')
+    arg.add_argument(
+        '--directory',
+        type=str,
+        help='Directory for generated files, they are reused by later runs (temporary by default)')
+    arg.add_argument(
+        '--output',
+        '-o',
+        type=str,
+        help='Name of JSON file for the results')
+    arg.add_argument(
+        '--compare',
+        type=str,
+        help='JSON file of an earlier run, the exit code is 1 if some operation became slower')
+    arg.add_argument(
+        '--threshold',
+        type=float,
+        default=0.2,
+        help='Allowed relative slowdown in the comparison mode')
+    return arg.parse_args()
+
+
+def get_format_name(nchannels, sampwidth, duration):
+    return '{} {}-bit {:g} s'.format(channel_names.get(nchannels, '{} channels'.format(nchannels)),
+                                     sampwidth * 8, duration)
+
+
+def generate_wav(file_name, nchannels, sampwidth, framerate, duration, block_size=2 ** 16):
+    nframes = int(duration * framerate)
+    random = np.random.RandomState(0)
+    frequencies = np.float32(220) * np.arange(1, nchannels + 1, dtype=np.float32)
+    new_file = WavWriter(file_name, nchannels, sampwidth, framerate, nframes)
+    for start in range(0, nframes, block_size):
+        times = np.arange(start, min(start + block_size, nframes), dtype=np.float64)[:, None] / framerate
+        values = (0.5 * np.sin(2 * np.pi * frequencies * times) +
+                  0.05 * random.standard_normal((len(times), nchannels))).astype(np.float32)
+        new_file.write(start, float32_to_samples(values, sampwidth))
+    new_file.close()
+
+
+def get_file_name(directory, nchannels, sampwidth, framerate, duration):
+    file_name = os.path.join(directory, 'synthetic_{}ch_{}bit_{}hz_{:g}s.wav'.format(nchannels, sampwidth * 8,
+                                                                                   framerate, duration))
+    if not os.path.exists(file_name):
+        generate_wav(file_name, nchannels, sampwidth, framerate, duration)
+    return file_name
+
+
+def run_operation(operation, file_name, directory):
+    if operation == 'load':
+        start = time.perf_counter()
+        audio_editor = AudioEditor(file_name)
+        np.array(audio_editor.samples)
+        return time.perf_counter() - start, audio_editor.samples.size
+    audio_editor = AudioEditor(file_name)
+    audio_editor.file_name = os.path.join(directory, os.path.basename(file_name))
+    count_of_samples = audio_editor.samples.size
+    duration_in_milliseconds = audio_editor.nframes / audio_editor.framerate * 1000
+    actions = {'change_volume': lambda: audio_editor.change_volume(3),
+               'change_speed': lambda: audio_editor.change_speed(1.5),
+               'change_temp': lambda: audio_editor.change_temp(1.5),
+               'change_pitch': lambda: audio_editor.change_pitch(3),
+               'join': lambda: audio_editor.join(file_name),
+               'split': lambda: audio_editor.split_and_write_result_in_new_files(
+                   [duration_in_milliseconds / 3, duration_in_milliseconds * 2 / 3]),
+               'write': lambda: audio_editor.write_changes_to_new_file(os.path.join(directory, 'written.wav'))}
+    start = time.perf_counter()
+    actions[operation]()
+    return time.perf_counter() - start, count_of_samples
+
+
+def get_peak_rss():
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def run_case(operation, file_name, directory):
+    seconds, count_of_samples = run_operation(operation, file_name, directory)
+    return seconds, count_of_samples, get_peak_rss()
+
+
+def measure_case(operation, file_name, directory, repeat):
+    best = None
+    for _ in range(repeat):
+        with Pool(1, maxtasksperchild=1) as pool:
+            result = pool.apply(run_case, (operation, file_name, directory))
+        if best is None or result[0] < best[0]:
+            best = result
+    return best
+
+
+def run_suite(channels, sampwidths, durations, operation_names, framerate=44100, repeat=1, directory=None):
+    results = []
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory = directory or temporary_directory
+        os.makedirs(directory, exist_ok=True)
+        for duration in durations:
+            for nchannels in channels:
+                for sampwidth in sampwidths:
+                    file_name = get_file_name(directory, nchannels, sampwidth, framerate, duration)
+                    for operation in operation_names:
+                        seconds, count_of_samples, peak_rss = measure_case(operation, file_name,
+                                                                           temporary_directory, repeat)
+                        results.append({'format': get_format_name(nchannels, sampwidth, duration),
+                                        'nchannels': nchannels, 'sampwidth': sampwidth, 'duration': duration,
+                                        'operation': operation, 'seconds': seconds,
+                                        'samples_per_second': count_of_samples / seconds if seconds else 0.0,
+                                        'peak_rss': peak_rss})
+                        print_result(results[-1])
+    return results
+
+
+def print_result(result):
+    peak_rss = 'n/a' if result['peak_rss'] is None else '{:.0f} MB'.format(result['peak_rss'] / 2 ** 20)
+    print('{:<25}{:<16}{:>10.3f} s{:>16.0f} samples/s{:>10}'.format(
+        result['format'], result['operation'], result['seconds'], result['samples_per_second'], peak_rss))
+
+
+def get_key(result):
+    return result['nchannels'], result['sampwidth'], result['duration'], result['operation']
+
+
+def get_regressions(results, baseline_results, threshold):
+    baseline = {get_key(result): result for result in baseline_results}
+    return [(result, baseline[get_key(result)]) for result in results
+            if get_key(result) in baseline and result['seconds'] > baseline[get_key(result)]['seconds'] * (1 + threshold)]
+
+
+def get_report(results):
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+
+
+if __name__ == '__main__':
+    arguments = get_argparse()
+    suite_results = run_suite(arguments.channels, arguments.sampwidths, arguments.durations, arguments.operations,
+                              arguments.framerate, arguments.repeat, arguments.directory)
+    if arguments.output is not None:
+        with open(arguments.output, 'w', encoding='utf-8') as output:
+            json.dump(get_report(suite_results), output, indent=4)
+    if arguments.compare is not None:
+        with open(arguments.compare, encoding='utf-8') as baseline_file:
+            regressions = get_regressions(suite_results, json.load(baseline_file)['results'], arguments.threshold)
+        for result, baseline_result in regressions:
+            print('slower: {} {} {:.3f} s -> {:.3f} s'.format(result['format'], result['operation'],
+                                                              baseline_result['seconds'], result['seconds']))
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,118 @@
+import os
+import hashlib
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from wavfile import WavReader
+
+
+WavFormat = namedtuple('WavFormat', ['nchannels', 'sampwidth', 'framerate', 'nframes', 'comptype', 'compname'])
+
+
+def get_resident_size(array):
+    return 0 if isinstance(array, np.memmap) else array.nbytes
+
+
+def get_wav_format(array):
+    values = array.tolist()
+    return WavFormat(*map(int, values[:4]), *values[4:])
+
+
+class SampleCache:
+    def __init__(self, memory_budget=2 ** 28, directory=None):
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.size = 0
+        self.count_of_hits = 0
+        self.count_of_misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_file_name(self, key, name):
+        return os.path.join(self.directory, hashlib.sha1(repr((key, name)).encode()).hexdigest() + '.npy')
+
+    def get(self, key, name):
+        array = self.entries.get((key, name))
+        if array is not None:
+            self.entries.move_to_end((key, name))
+        elif self.directory is not None and os.path.exists(self.get_file_name(key, name)):
+            array = np.load(self.get_file_name(key, name), mmap_mode='r')
+            self.add_to_memory((key, name), array)
+        if array is None:
+            self.count_of_misses += 1
+        else:
+            self.count_of_hits += 1
+        return array
+
+    def put(self, key, name, array):
+        array = np.asarray(array)
+        array.flags.writeable = False
+        if self.directory is not None and not os.path.exists(self.get_file_name(key, name)):
+            temporary_file_name = self.get_file_name(key, name) + '.part'
+            with open(temporary_file_name, 'wb') as file:
+                np.save(file, array)
+            os.replace(temporary_file_name, self.get_file_name(key, name))
+        self.add_to_memory((key, name), array)
+        return array
+
+    def add_to_memory(self, entry_key, array):
+        if entry_key in self.entries:
+            self.size -= get_resident_size(self.entries.pop(entry_key))
+        if get_resident_size(array) > self.memory_budget:
+            return
+        self.entries[entry_key] = array
+        self.size += get_resident_size(array)
+        while self.size > self.memory_budget:
+            _, evicted_array = self.entries.popitem(last=False)
+            self.size -= get_resident_size(evicted_array)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+sample_cache = None
+
+
+def enable_cache(memory_budget=2 ** 28, directory=None):
+    global sample_cache
+    sample_cache = SampleCache(memory_budget, directory)
+    return sample_cache
+
+
+def disable_cache():
+    global sample_cache
+    sample_cache = None
+
+
+def get_file_key(file_name):
+    stat = os.stat(file_name)
+    return os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns
+
+
+def read_wav(file_name):
+    if sample_cache is not None:
+        key = get_file_key(file_name)
+        wav_format = sample_cache.get(key, 'wav format')
+        samples = sample_cache.get(key, 'samples')
+        if wav_format is not None and samples is not None:
+            return get_wav_format(wav_format), samples, key
+    wav = WavReader(file_name, 'c')
+    wav_format = WavFormat(wav.nchannels, wav.sampwidth, wav.framerate, wav.nframes, wav.comptype, wav.compname)
+    samples = wav.get_samples()
+    wav.close()
+    if sample_cache is None:
+        return wav_format, samples, None
+    sample_cache.put(key, 'wav format', np.array([str(value) for value in wav_format]))
+    return wav_format, sample_cache.put(key, 'samples', np.array(samples)), key
+
+
+def get_cached(key, name, function):
+    if sample_cache is None or key is None:
+        return function()
+    array = sample_cache.get(key, name)
+    if array is None:
+        array = sample_cache.put(key, name, function())
+    return array
@@ -0,0 +1,25 @@
+import numpy as np
+
+from sampleformat import sample_types, samples_to_float, float_to_samples
+from profiling import profiled
+
+
+def db_to_gain(dB):
+    return 10 ** (np.asarray(dB, dtype=np.float64) / 20)
+
+
+def get_envelope(breakpoints, nframes, framerate, start=0):
+    positions = [position_in_milliseconds * framerate / 1000 for position_in_milliseconds, _ in breakpoints]
+    gains = db_to_gain([dB for _, dB in breakpoints])
+    return np.interp(np.arange(start, start + nframes), positions, gains)[:, np.newaxis]
+
+
+@profiled
+def apply_gain(samples, gain, sampwidth, block_size=2 ** 16):
+    gain = np.asarray(gain, dtype=np.float64)
+    result = np.empty(samples.shape, dtype=sample_types[sampwidth])
+    for start in range(0, len(samples), block_size):
+        end = start + block_size
+        block_gain = gain[start:end] if gain.ndim == 2 else gain
+        result[start:end] = float_to_samples(samples_to_float(samples[start:end], sampwidth) * block_gain, sampwidth)
+    return result
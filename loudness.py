@@ -0,0 +1,124 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from sampleformat import samples_to_float, get_peak
+from profiling import profiled
+
+
+Loudness = namedtuple('Loudness', ['peak', 'rms', 'integrated'])
+
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+COUNT_OF_SEGMENTS_IN_BLOCK = 4
+SURROUND_CHANNEL_WEIGHTS = [1.0, 1.0, 1.0, 0.0, 1.41, 1.41]
+
+
+def get_shelving_filter(framerate, frequency=1681.974450955533, gain_in_dB=3.999843853973347,
+                        q=0.7071752369554196):
+    k = math.tan(math.pi * frequency / framerate)
+    high_gain = 10 ** (gain_in_dB / 20)
+    band_gain = high_gain ** 0.4996667741545416
+    denominator = 1 + k / q + k * k
+    b = np.array([high_gain + band_gain * k / q + k * k, 2 * (k * k - high_gain), high_gain - band_gain * k / q + k * k])
+    a = np.array([denominator, 2 * (k * k - 1), 1 - k / q + k * k])
+    return b / denominator, a / denominator
+
+
+def get_high_pass_filter(framerate, frequency=38.13547087602444, q=0.5003270373238773):
+    k = math.tan(math.pi * frequency / framerate)
+    denominator = 1 + k / q + k * k
+    return np.array([1.0, -2.0, 1.0]), np.array([1.0, 2 * (k * k - 1) / denominator, (1 - k / q + k * k) / denominator])
+
+
+def get_frequency_response(filters, count_of_bins):
+    z = np.exp(-1j * np.pi * np.arange(count_of_bins) / (count_of_bins - 1))
+    response = np.ones(count_of_bins, dtype=complex)
+    for b, a in filters:
+        response *= np.polyval(b[::-1], z) / np.polyval(a[::-1], z)
+    return response
+
+
+def get_k_weighting(framerate):
+    length = 1 << math.ceil(math.log2(framerate / 10))
+    filters = [get_shelving_filter(framerate), get_high_pass_filter(framerate)]
+    return np.fft.irfft(get_frequency_response(filters, length + 1), n=2 * length)[:length]
+
+
+def get_channel_weights(nchannels):
+    if nchannels == len(SURROUND_CHANNEL_WEIGHTS):
+        return np.array(SURROUND_CHANNEL_WEIGHTS)
+    return np.ones(nchannels)
+
+
+def to_dB(power):
+    with np.errstate(divide='ignore'):
+        return 10 * np.log10(power)
+
+
+class LoudnessMeter:
+    def __init__(self, nchannels, sampwidth, framerate):
+        self.sampwidth = sampwidth
+        impulse_response = get_k_weighting(framerate)
+        self.fft_size = 4 * len(impulse_response)
+        self.chunk_size = self.fft_size - len(impulse_response) + 1
+        self.response = np.fft.rfft(impulse_response, self.fft_size)[:, np.newaxis]
+        self.tail = np.zeros((len(impulse_response) - 1, nchannels))
+        self.segment_size = round(framerate * 0.1)
+        self.remainder = np.zeros((0, nchannels))
+        self.segments = [np.zeros((0, nchannels))]
+        self.channel_weights = get_channel_weights(nchannels)
+        self.peak = 0.0
+        self.sum_of_squares = 0.0
+        self.count_of_samples = 0
+
+    def process(self, samples):
+        values = samples_to_float(samples, self.sampwidth) / get_peak(self.sampwidth)
+        if values.size:
+            self.peak = max(self.peak, np.abs(values).max())
+        self.sum_of_squares += np.einsum('ij,ij->', values, values)
+        self.count_of_samples += values.size
+        for start in range(0, len(values), self.chunk_size):
+            self.add_segments(self.filter(values[start:start + self.chunk_size]) ** 2)
+
+    def filter(self, values):
+        result = np.fft.irfft(np.fft.rfft(values, self.fft_size, axis=0) * self.response, self.fft_size, axis=0)
+        result = result[:len(values) + len(self.tail)]
+        result[:len(self.tail)] += self.tail
+        self.tail = result[len(values):]
+        return result[:len(values)]
+
+    def add_segments(self, squares):
+        squares = np.concatenate((self.remainder, squares))
+        count_of_segments = len(squares) // self.segment_size
+        end = count_of_segments * self.segment_size
+        self.segments.append(squares[:end].reshape(count_of_segments, self.segment_size, squares.shape[1]).sum(axis=1))
+        self.remainder = squares[end:]
+
+    def get_block_powers(self):
+        segments = np.concatenate(self.segments) @ self.channel_weights
+        if len(segments) < COUNT_OF_SEGMENTS_IN_BLOCK:
+            return np.zeros(0)
+        sums = np.convolve(segments, np.ones(COUNT_OF_SEGMENTS_IN_BLOCK), mode='valid')
+        return sums / (COUNT_OF_SEGMENTS_IN_BLOCK * self.segment_size)
+
+    def get_integrated_loudness(self):
+        powers = self.get_block_powers()
+        powers = powers[-0.691 + to_dB(powers) > ABSOLUTE_GATE]
+        if not len(powers):
+            return -np.inf
+        relative_gate = -0.691 + to_dB(powers.mean()) + RELATIVE_GATE
+        return -0.691 + to_dB(powers[-0.691 + to_dB(powers) > relative_gate].mean())
+
+    def get_loudness(self):
+        rms = to_dB(self.sum_of_squares / self.count_of_samples) if self.count_of_samples else -np.inf
+        return Loudness(2 * to_dB(self.peak), rms, self.get_integrated_loudness())
+
+
+@profiled
+def measure_loudness(samples, sampwidth, framerate, block_size=2 ** 16):
+    meter = LoudnessMeter(samples.shape[1], sampwidth, framerate)
+    for start in range(0, len(samples), block_size):
+        meter.process(samples[start:start + block_size])
+    return meter.get_loudness()
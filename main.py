@@ -1,9 +1,6 @@
+import os
 import sys
 import argparse
-from PyQt5.QtWidgets import QApplication
-
-from audioeditor import AudioEditor
-from audioplayer import AudioPlayer
 
 
 def get_argparse():
@@ -31,55 +28,180 @@ def get_argparse():
     arg.add_argument(
         "--pitch",
         "-p",
-        type=int,
-        help='Pitch in semitone')
+        type=float,
+        help='Pitch in semitone, fractional values are allowed')
     arg.add_argument(
         "--volume",
         "-v",
-        type=int,
+        type=float,
         help='How much volume (in dB) will add')
+    arg.add_argument(
+        "--mix",
+        "-m",
+        type=str,
+        nargs='+',
+        metavar='FILE[,VOLUME[,OFFSET]]',
+        help='Names of wav files, which will be mixed into running file, with optional volume (in dB) and start '
+             'offset (in milliseconds), for example music.wav,-12,2000')
+    arg.add_argument(
+        "--loudness",
+        "-l",
+        type=float,
+        help='Normalize to the integrated loudness (in LUFS, ITU-R BS.1770), for example -23')
     arg.add_argument(
         "--split",
         "-spl",
-        type=int,
-        help='Position (in milliseconds) of split file on two and write in two new files')
+        type=float,
+        nargs='+',
+        help='Positions (in milliseconds, rounded to the nearest frame) of split file and write parts in new files')
+    arg.add_argument(
+        "--split-on-silence",
+        type=float,
+        metavar='THRESHOLD',
+        help='Split file at pauses quieter than the threshold (in dBFS, for example -40) and write parts in new files')
+    arg.add_argument(
+        "--min-silence",
+        type=float,
+        help='Minimal duration (in milliseconds) of a pause for --split-on-silence (500 by default)')
     arg.add_argument(
         "--join",
         "-j",
         type=str,
-        help='Name of wav file, which will be joined with running file')
+        nargs='+',
+        help='Names of wav files, which will be joined with running file')
+    arg.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        help='Count of processes for temp and pitch changing (1 by default)')
+    arg.add_argument(
+        "--quality",
+        "-q",
+        type=str,
+        choices=['nearest', 'linear', 'sinc'],
+        help='Resampling quality for speed and pitch changing (linear by default)')
+    arg.add_argument(
+        "--stream",
+        action='store_true',
+        help='Process the file block by block with constant memory (speed, temp, pitch and volume only)')
+    arg.add_argument(
+        "--block-size",
+        "-b",
+        type=int,
+        help='Count of frames in one block of the stream mode (65536 by default)')
+    arg.add_argument(
+        "--cache-dir",
+        type=str,
+        help='Directory of the cache of decoded samples and temp changes, reused by later runs on the same files')
+    arg.add_argument(
+        "--no-play",
+        action='store_true',
+        help='Only write the changed file, without starting the audio player')
+    arg.add_argument(
+        "--profile",
+        type=str,
+        help='Name of JSON file for the time, CPU time, peak memory and samples/s of each operation '
+             '(the AUDIOEDITOR_PROFILE environment variable does the same)')
 
     check_arguments(arg)
     return arg.parse_args()
 
 
 def check_arguments(arg):
-    non_none_arguments = {argument: value for argument, value in vars(arg.parse_args()).items() if value}
+    non_none_arguments = {argument: value for argument, value in vars(arg.parse_args()).items()
+                          if value and argument not in ('no_play', 'cache_dir', 'profile', 'workers', 'quality',
+                                                        'block_size')}
     if 'split' in non_none_arguments and len(non_none_arguments) > 2:
         raise ValueError('Command \'split\' is prohibited to use with other arguments')
     if 'join' in non_none_arguments and len(non_none_arguments) > 2:
         raise ValueError('Command \'join\' is prohibited to use with other arguments')
+    if 'split_on_silence' in non_none_arguments and len(set(non_none_arguments) - {'min_silence'}) > 2:
+        raise ValueError('Command \'split-on-silence\' is prohibited to use with other arguments')
+    if 'stream' in non_none_arguments and ('split' in non_none_arguments or 'join' in non_none_arguments):
+        raise ValueError('Commands \'split\' and \'join\' are prohibited to use in stream mode')
+    if 'stream' in non_none_arguments and ('loudness' in non_none_arguments or 'mix' in non_none_arguments):
+        raise ValueError('Commands \'loudness\' and \'mix\' are prohibited to use in stream mode')
 
 
-def execute_commands_and_write_changes_in_new_file(non_none_arguments):
+def get_changing_actions(audio_edditor, quality):
+    return {'speed': lambda factor: audio_edditor.change_speed(factor, quality),
+            'volume': audio_edditor.change_volume,
+            'pitch': lambda pitch_in_semitone: audio_edditor.change_pitch(pitch_in_semitone, quality=quality),
+            'temp': audio_edditor.change_temp,
+            'mix': lambda track_specifications: audio_edditor.mix([get_mix_track(specification)
+                                                                   for specification in track_specifications]),
+            'loudness': lambda target_lufs: audio_edditor.normalize(target_lufs)}
+
+
+def get_mix_track(specification):
+    from mixer import MixTrack
+    file_name, *parameters = specification.split(',')
+    return MixTrack(file_name, *map(float, parameters))
+
+
+def join_files(file_names):
+    for file_name in file_names:
+        audio_edditor.join(file_name)
+
+
+def execute_commands(non_none_arguments):
     for key, value in non_none_arguments.items():
-        if key != 'file':
+        if key in changing_actions:
             changing_actions[key](value)
-    if 'split' not in non_none_arguments:
+
+
+def execute_commands_and_write_changes_in_new_file(non_none_arguments):
+    execute_commands(non_none_arguments)
+    if 'split' not in non_none_arguments and 'split_on_silence' not in non_none_arguments:
         audio_edditor.write_changes_to_new_file()
 
 
+def get_audio_editor_and_changing_actions(arguments):
+    if arguments.stream:
+        from stream import StreamEditor
+        audio_edditor = StreamEditor(arguments.file, arguments.block_size or 2 ** 16)
+        return audio_edditor, get_changing_actions(audio_edditor, arguments.quality or 'linear')
+    if arguments.join or arguments.split or arguments.split_on_silence:
+        from timeline import Timeline
+        audio_edditor = Timeline(arguments.file)
+        return audio_edditor, {'join': join_files, 'split': audio_edditor.split_and_write_result_in_new_files,
+                               'split_on_silence': lambda threshold_in_dB: audio_edditor.split_on_silence(
+                                   threshold_in_dB, arguments.min_silence or 500)}
+    from audioeditor import AudioEditor
+    from render import RenderGraph
+    if arguments.cache_dir:
+        from cache import enable_cache
+        enable_cache(directory=arguments.cache_dir)
+    audio_edditor = RenderGraph(AudioEditor(arguments.file))
+    audio_edditor.audio_editor.workers = arguments.workers or 1
+    return audio_edditor, get_changing_actions(audio_edditor, arguments.quality or 'linear')
+
+
+def play(audio_edditor):
+    from PyQt5.QtWidgets import QApplication
+    from audioplayer import AudioPlayer
+    app = QApplication(sys.argv)
+    audioplayer = AudioPlayer(audio_edditor)
+    audioplayer.show()
+    sys.exit(app.exec_())
+
+
 if __name__ == '__main__':
     arguments = get_argparse()
-    audio_edditor = AudioEditor(arguments.file)
-    changing_actions = {'speed': audio_edditor.change_speed, 'join': audio_edditor.join,
-                        'split': audio_edditor.split_and_write_result_in_new_files,
-                        'volume': audio_edditor.change_volume, 'pitch': audio_edditor.change_pitch,
-                        'temp': audio_edditor.change_temp}
     non_none_arguments = {argument: value for argument, value in vars(arguments).items() if value}
-    execute_commands_and_write_changes_in_new_file(non_none_arguments)
-    if 'split' not in non_none_arguments:
-        app = QApplication(sys.argv)
-        audioplayer = AudioPlayer('changing_' + arguments.file, True)
-        audioplayer.show()
-        sys.exit(app.exec_())
+    profile_file_name = arguments.profile or os.environ.get('AUDIOEDITOR_PROFILE')
+    if profile_file_name:
+        from profiling import enable_profiling
+        enable_profiling()
+    audio_edditor, changing_actions = get_audio_editor_and_changing_actions(arguments)
+    playing = 'split' not in non_none_arguments and 'split_on_silence' not in non_none_arguments and \
+        not arguments.no_play
+    if playing:
+        execute_commands(non_none_arguments)
+    else:
+        execute_commands_and_write_changes_in_new_file(non_none_arguments)
+    if profile_file_name:
+        from profiling import profiler
+        profiler.write_report(profile_file_name)
+    if playing:
+        play(audio_edditor)
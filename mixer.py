@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+import numpy as np
+
+from sampleformat import samples_to_float32, float32_to_samples, get_channel_matrix, milliseconds_to_frames
+from gain import db_to_gain
+from wavfile import WavReader, WavWriter
+from profiling import profiled
+
+
+MixTrack = namedtuple('MixTrack', ['file_name', 'volume_in_dB', 'offset_in_milliseconds', 'matrix'])
+MixTrack.__new__.__defaults__ = (0, 0, None)
+
+
+class TrackReader:
+    def __init__(self, get_samples, nchannels, sampwidth, framerate, nframes, volume_in_dB=0, offset=0, matrix=None):
+        self.get_samples = get_samples
+        self.nchannels = nchannels
+        self.sampwidth = sampwidth
+        self.framerate = framerate
+        self.nframes = nframes
+        self.gain = db_to_gain(volume_in_dB)
+        self.offset = offset
+        self.matrix = get_channel_matrix(nchannels, nchannels) if matrix is None else np.asarray(matrix, dtype=float)
+        self.mixing_matrix = None
+
+    @property
+    def output_nchannels(self):
+        return self.matrix.shape[1]
+
+    @property
+    def end(self):
+        return self.offset + self.nframes
+
+    def start(self, nchannels):
+        matrix = self.matrix @ get_channel_matrix(self.output_nchannels, nchannels)
+        self.mixing_matrix = (matrix * self.gain).astype(np.float32)
+
+    def add_to(self, accumulator, position):
+        start = max(position, self.offset)
+        end = min(position + len(accumulator), self.end)
+        if start >= end:
+            return
+        values = samples_to_float32(self.get_samples(start - self.offset, end - self.offset), self.sampwidth)
+        accumulator[start - position:end - position] += values @ self.mixing_matrix
+
+
+def get_file_track_reader(track):
+    wav = WavReader(track.file_name)
+    return TrackReader(wav.get_samples, wav.nchannels, wav.sampwidth, wav.framerate, wav.nframes, track.volume_in_dB,
+                       milliseconds_to_frames(track.offset_in_milliseconds, wav.framerate), track.matrix)
+
+
+def get_limited(values, threshold):
+    magnitudes = np.abs(values)
+    over = magnitudes > threshold
+    if np.any(over):
+        excess = (magnitudes[over] - threshold) / (1 - threshold)
+        values[over] = np.sign(values[over]) * (threshold + (1 - threshold) * np.tanh(excess))
+    return values
+
+
+class Mixer:
+    def __init__(self, track_readers, limit_in_dB=-1.0, block_size=2 ** 16):
+        framerates = {track_reader.framerate for track_reader in track_readers}
+        if len(framerates) > 1:
+            raise ValueError('Tracks have different frame rates {}'.format(', '.join(map(str, sorted(framerates)))))
+        self.track_readers = track_readers
+        self.framerate = framerates.pop()
+        self.nchannels = max(track_reader.output_nchannels for track_reader in track_readers)
+        self.sampwidth = max(track_reader.sampwidth for track_reader in track_readers)
+        self.nframes = max(track_reader.end for track_reader in track_readers)
+        self.threshold = None if limit_in_dB is None else np.float32(db_to_gain(limit_in_dB))
+        self.block_size = block_size
+        for track_reader in track_readers:
+            track_reader.start(self.nchannels)
+
+    def get_blocks(self):
+        for position in range(0, self.nframes, self.block_size):
+            accumulator = np.zeros((min(self.block_size, self.nframes - position), self.nchannels), dtype=np.float32)
+            for track_reader in self.track_readers:
+                track_reader.add_to(accumulator, position)
+            if self.threshold is not None:
+                accumulator = get_limited(accumulator, self.threshold)
+            yield float32_to_samples(accumulator, self.sampwidth)
+
+
+@profiled
+def mix_files(tracks, new_name, limit_in_dB=-1.0, block_size=2 ** 16):
+    mixer = Mixer([get_file_track_reader(track) for track in tracks], limit_in_dB, block_size)
+    new_file = WavWriter(new_name, mixer.nchannels, mixer.sampwidth, mixer.framerate, mixer.nframes)
+    position = 0
+    for block in mixer.get_blocks():
+        new_file.write(position, block)
+        position += len(block)
+    new_file.close()
+    return mixer
@@ -0,0 +1,145 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from vocoder import PhaseVocoder, get_count_of_hops, get_unit_phasors
+
+
+class SharedArray:
+    def __init__(self, shape, name=None):
+        self.shape = tuple(shape)
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None,
+                                                 size=max(int(np.prod(self.shape)) * 8, 1))
+        self.array = np.ndarray(self.shape, dtype=np.float64, buffer=self.memory.buf)
+
+    @classmethod
+    def from_array(cls, array):
+        shared_array = cls(array.shape)
+        shared_array.array[:] = array
+        return shared_array
+
+    def get_description(self):
+        return self.memory.name, self.shape
+
+    def close(self):
+        self.array = None
+        self.memory.close()
+
+    def unlink(self):
+        self.close()
+        self.memory.unlink()
+
+
+def attach(description):
+    name, shape = description
+    return SharedArray(shape, name)
+
+
+def get_vocoder(content, factor, window_size, h, first_hop=0):
+    vocoder = PhaseVocoder(factor, window_size, h)
+    vocoder.content = content
+    vocoder.count_of_hops = first_hop
+    vocoder.result_offset = int(vocoder.get_position(first_hop) / factor)
+    return vocoder
+
+
+def change_temp_for_one_channel(content_description, result_description, factor, window_size, h):
+    content = attach(content_description)
+    result = attach(result_description)
+    vocoder = PhaseVocoder(factor, window_size, h)
+    result.array[:] = np.concatenate((vocoder.process(content.array), vocoder.flush()))
+    content.close()
+    result.close()
+
+
+def calculate_phase_rotation(content_description, factor, window_size, h, first_hop, last_hop):
+    content = attach(content_description)
+    vocoder = get_vocoder(content.array, factor, window_size, h, first_hop)
+    rotation = np.ones(window_size // 2 + 1, dtype=complex)
+    for batch_start in range(first_hop, last_hop, vocoder.hops_in_batch):
+        positions = vocoder.get_position(np.arange(batch_start, min(batch_start + vocoder.hops_in_batch, last_hop)))
+        first_spectra, second_spectra = vocoder.get_spectra_of_two_consecutive_windows(positions)
+        rotations, _ = vocoder.get_phase_rotations(first_spectra, second_spectra)
+        rotation = get_unit_phasors(rotation * np.prod(rotations, axis=0))[0]
+    content.close()
+    return rotation
+
+
+def overlap_add_rephased_windows(content_description, result_description, phasor, factor, window_size, h,
+                                 first_hop, last_hop):
+    content = attach(content_description)
+    result = attach(result_description)
+    vocoder = get_vocoder(content.array, factor, window_size, h, first_hop)
+    vocoder.phasor = phasor
+    parts = []
+    while vocoder.count_of_hops < last_hop:
+        parts.append(vocoder.process_hops(min(vocoder.count_of_hops + vocoder.hops_in_batch, last_hop)))
+    parts.append(vocoder.pop_result(vocoder.result_offset + len(vocoder.result)))
+    result.array[:] = np.concatenate(parts)
+    content.close()
+    result.close()
+
+
+class ParallelPhaseVocoder:
+    def __init__(self, factor, window_size, h, workers):
+        self.factor = factor
+        self.window_size = window_size
+        self.h = h
+        self.workers = workers
+
+    def change_temp_for_each_channel(self, channels):
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            if len(channels) == 1:
+                return [self.change_temp_for_one_channel_by_segments(executor, channels[0])]
+            return self.change_temp_for_channels(executor, channels)
+
+    def get_result_length(self, content):
+        return int(len(content) / self.factor) + self.window_size
+
+    def change_temp_for_channels(self, executor, channels):
+        contents = [SharedArray.from_array(channel) for channel in channels]
+        results = [SharedArray((self.get_result_length(channel),)) for channel in channels]
+        try:
+            futures = [executor.submit(change_temp_for_one_channel, content.get_description(),
+                                       result.get_description(), self.factor, self.window_size, self.h)
+                       for content, result in zip(contents, results)]
+            for future in futures:
+                future.result()
+            return [result.array.copy() for result in results]
+        finally:
+            for shared_array in contents + results:
+                shared_array.unlink()
+
+    def get_segments(self, count_of_hops):
+        hops_in_segment = max(math.ceil(count_of_hops / self.workers), 1)
+        return [(first_hop, min(first_hop + hops_in_segment, count_of_hops))
+                for first_hop in range(0, count_of_hops, hops_in_segment)]
+
+    def change_temp_for_one_channel_by_segments(self, executor, channel):
+        content = SharedArray.from_array(channel)
+        vocoder = get_vocoder(None, self.factor, self.window_size, self.h)
+        result = np.zeros(self.get_result_length(channel))
+        segments = self.get_segments(get_count_of_hops(len(channel), self.window_size, self.h, self.factor))
+        starts = [int(vocoder.get_position(first_hop) / self.factor) for first_hop, _ in segments]
+        ends = [int(vocoder.get_position(last_hop - 1) / self.factor) + self.window_size for _, last_hop in segments]
+        parts = [SharedArray((end - start,)) for start, end in zip(starts, ends)]
+        try:
+            rotations = self.wait(executor, [(calculate_phase_rotation, content.get_description(), self.factor,
+                                              self.window_size, self.h, first_hop, last_hop)
+                                             for first_hop, last_hop in segments])
+            phasors = get_unit_phasors(np.cumprod([np.ones(self.window_size // 2 + 1)] + rotations[:-1], axis=0))[0]
+            self.wait(executor, [(overlap_add_rephased_windows, content.get_description(), part.get_description(),
+                                  phasor, self.factor, self.window_size, self.h, first_hop, last_hop)
+                                 for part, phasor, (first_hop, last_hop) in zip(parts, phasors, segments)])
+            for start, end, part in zip(starts, ends, parts):
+                result[start:end] += part.array
+        finally:
+            for shared_array in [content] + parts:
+                shared_array.unlink()
+        return result
+
+    def wait(self, executor, tasks):
+        futures = [executor.submit(*task) for task in tasks]
+        return [future.result() for future in futures]
@@ -0,0 +1,153 @@
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from sampleformat import samples_to_float32
+from cache import get_file_key
+
+
+PEAK_LEVELS = (256, 4096, 65536)
+PEAK_SCALE = 32767
+HEADER = struct.Struct('<4sHHQQqB')
+MAGIC = b'PEAK'
+VERSION = 1
+
+PeakLevel = namedtuple('PeakLevel', ['samples_per_bin', 'minimums', 'maximums', 'rms'])
+
+
+def get_bins(values, samples_per_bin):
+    count = len(values) - len(values) % samples_per_bin
+    bins = values[:count].reshape(-1, samples_per_bin, values.shape[1])
+    minimums = [bins.min(axis=1)]
+    maximums = [bins.max(axis=1)]
+    squares = [np.square(bins).sum(axis=1)]
+    if count < len(values):
+        minimums.append(values[count:].min(axis=0, keepdims=True))
+        maximums.append(values[count:].max(axis=0, keepdims=True))
+        squares.append(np.square(values[count:]).sum(axis=0, keepdims=True))
+    return np.concatenate(minimums), np.concatenate(maximums), np.concatenate(squares)
+
+
+def get_coarser_level(level, squares, counts, samples_per_bin):
+    if not len(counts):
+        return level._replace(samples_per_bin=samples_per_bin), squares, counts
+    starts = np.arange(0, len(counts), samples_per_bin // level.samples_per_bin)
+    squares = np.add.reduceat(squares, starts)
+    counts = np.add.reduceat(counts, starts)
+    return PeakLevel(samples_per_bin, np.minimum.reduceat(level.minimums, starts),
+                     np.maximum.reduceat(level.maximums, starts), np.sqrt(squares / counts[:, None])), squares, counts
+
+
+def quantize(values):
+    return np.round(np.clip(values, -1, 1) * PEAK_SCALE).astype('<i2')
+
+
+def get_peak_levels(blocks, nchannels, sampwidth, levels=PEAK_LEVELS):
+    rest = np.zeros((0, nchannels), dtype=np.float32)
+    parts = []
+    nframes = 0
+    for block in blocks:
+        nframes += len(block)
+        values = np.concatenate((rest, samples_to_float32(block, sampwidth)))
+        count = len(values) - len(values) % levels[0]
+        parts.append(get_bins(values[:count], levels[0]))
+        rest = values[count:]
+    parts.append(get_bins(rest, levels[0]))
+    minimums, maximums, squares = (np.concatenate(part) for part in zip(*parts))
+    counts = np.full(len(squares), levels[0])
+    if len(rest):
+        counts[-1] = len(rest)
+    level = PeakLevel(levels[0], minimums, maximums, np.sqrt(squares / counts[:, None]))
+    peak_levels = [level]
+    for samples_per_bin in levels[1:]:
+        level, squares, counts = get_coarser_level(level, squares, counts, samples_per_bin)
+        peak_levels.append(level)
+    return nframes, [PeakLevel(level.samples_per_bin, quantize(level.minimums), quantize(level.maximums),
+                               quantize(level.rms)) for level in peak_levels]
+
+
+class PeakIndex:
+    def __init__(self, nchannels, nframes, levels):
+        self.nchannels = nchannels
+        self.nframes = nframes
+        self.levels = levels
+
+    @classmethod
+    def from_source(cls, source, block_size=2 ** 20):
+        nframes, levels = get_peak_levels(source.get_blocks(block_size), source.nchannels, source.sampwidth)
+        return cls(source.nchannels, nframes, levels)
+
+    def get_level(self, frames_per_column):
+        level = self.levels[0]
+        for coarser_level in self.levels[1:]:
+            if coarser_level.samples_per_bin <= frames_per_column:
+                level = coarser_level
+        return level
+
+    def get_columns(self, start, end, width):
+        level = self.get_level((end - start) / width)
+        count_of_bins = len(level.minimums)
+        if not count_of_bins:
+            return tuple(np.zeros((width, self.nchannels), dtype=np.float32) for _ in range(3))
+        edges = np.linspace(start, end, width + 1) // level.samples_per_bin
+        starts = np.clip(edges[:-1].astype(np.int64), 0, count_of_bins - 1)
+        stop = min(max(int(edges[-1]), starts[-1] + 1), count_of_bins)
+        first = starts[0]
+        starts = starts - first
+        rms = level.rms[first:stop].astype(np.float32) ** 2
+        counts = np.add.reduceat(np.ones(stop - first, dtype=np.float32), starts)
+        scale = np.float32(1 / PEAK_SCALE)
+        return (np.minimum.reduceat(level.minimums[first:stop], starts) * scale,
+                np.maximum.reduceat(level.maximums[first:stop], starts) * scale,
+                np.sqrt(np.add.reduceat(rms, starts) / counts[:, None]) * scale)
+
+    def write(self, file_name, key):
+        with open(file_name + '.part', 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.nchannels, self.nframes, key[1], key[2], len(self.levels)))
+            file.write(np.array([level.samples_per_bin for level in self.levels], dtype='<u4').tobytes())
+            file.write(np.array([len(level.minimums) for level in self.levels], dtype='<u8').tobytes())
+            for level in self.levels:
+                file.write(np.stack((level.minimums, level.maximums, level.rms), axis=1).tobytes())
+        os.replace(file_name + '.part', file_name)
+
+    @classmethod
+    def read(cls, file_name, key):
+        with open(file_name, 'rb') as file:
+            magic, version, nchannels, nframes, size, mtime, count_of_levels = HEADER.unpack(file.read(HEADER.size))
+            if (magic, version, size, mtime) != (MAGIC, VERSION, key[1], key[2]):
+                return None
+            levels = np.frombuffer(file.read(4 * count_of_levels), dtype='<u4')
+            counts = np.frombuffer(file.read(8 * count_of_levels), dtype='<u8')
+            peak_levels = []
+            for samples_per_bin, count in zip(levels, counts):
+                values = np.fromfile(file, dtype='<i2', count=int(count) * 3 * nchannels)
+                values = values.reshape(int(count), 3, nchannels)
+                peak_levels.append(PeakLevel(int(samples_per_bin), values[:, 0], values[:, 1], values[:, 2]))
+        return cls(nchannels, nframes, peak_levels)
+
+
+def get_sidecar_name(file_name):
+    return file_name + '.peaks'
+
+
+def get_peak_index(source):
+    file_name = getattr(source, 'file_name', None)
+    if file_name is None:
+        return PeakIndex.from_source(source)
+    key = get_file_key(file_name)
+    sidecar_name = get_sidecar_name(file_name)
+    if os.path.exists(sidecar_name):
+        try:
+            peak_index = PeakIndex.read(sidecar_name, key)
+        except (OSError, ValueError, struct.error):
+            peak_index = None
+        if peak_index is not None:
+            return peak_index
+    peak_index = PeakIndex.from_source(source)
+    try:
+        peak_index.write(sidecar_name, key)
+    except OSError:
+        pass
+    return peak_index
@@ -0,0 +1,165 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from resample import get_resampler
+from profiling import profiled
+
+
+def get_pitch_factor(pitch_in_semitone):
+    return 2 ** (pitch_in_semitone / 12.0)
+
+
+def get_nearest_peaks(magnitudes):
+    count_of_bins = magnitudes.shape[-1]
+    is_peak = np.ones(magnitudes.shape, dtype=bool)
+    is_peak[..., 1:-1] = (magnitudes[..., 1:-1] > magnitudes[..., :-2]) & (magnitudes[..., 1:-1] >= magnitudes[..., 2:])
+    peaks = np.flatnonzero(is_peak)
+    bounds = (peaks[:-1] + peaks[1:] + 2) // 2
+    is_last = peaks[:-1] % count_of_bins == count_of_bins - 1
+    bounds[is_last] = peaks[1:][is_last]
+    counts = np.diff(bounds, prepend=0, append=is_peak.size)
+    return np.repeat(peaks, counts).reshape(magnitudes.shape)
+
+
+def get_analysis_hop(factor, h):
+    return h if factor >= 1 else round(h / factor)
+
+
+def get_wrapped(phases):
+    return phases - np.float32(2 * np.pi) * np.round(phases * np.float32(1 / (2 * np.pi)))
+
+
+class PitchShifter:
+    def __init__(self, factor, nframes, nchannels, window_size=2 ** 13, h=2 ** 11, quality='linear', speed=1,
+                 phase_locking=True, hops_in_batch=16):
+        self.factor = factor
+        self.nframes = round(nframes / speed)
+        self.window_size = window_size
+        self.h = get_analysis_hop(factor, h)
+        self.phase_locking = phase_locking
+        self.hops_in_batch = hops_in_batch
+        self.hanning_window = np.hanning(window_size)
+        self.window_gain = np.sum(self.hanning_window ** 2) / (self.h * factor)
+        self.expected_advances = (2 * np.pi * self.h * np.arange(window_size // 2 + 1) /
+                                  window_size).astype(np.float32)
+        self.trim = round(window_size * (factor + 1) / 2)
+        self.resampler = get_resampler(factor * speed, round(nframes * factor), nchannels, quality)
+        self.phases = np.zeros((nchannels, window_size // 2 + 1), dtype=np.float32)
+        self.synthesis_phases = np.zeros(nchannels * (window_size // 2 + 1), dtype=np.float32)
+        self.count_of_hops = 0
+        self.content = np.zeros((window_size, nchannels))
+        self.content_offset = 0
+        self.result = np.zeros((0, nchannels))
+        self.result_offset = 0
+        self.count_of_frames = 0
+
+    def get_synthesis_position(self, count_of_hops):
+        return np.round(np.asarray(count_of_hops) * (self.h * self.factor)).astype(np.int64)
+
+    def get_length(self):
+        return self.content_offset + len(self.content)
+
+    def get_count_of_ready_hops(self):
+        return max((self.get_length() - self.window_size) // self.h + 1, 0)
+
+    def process(self, values):
+        self.content = np.concatenate((self.content, values))
+        results = []
+        while self.count_of_hops + self.hops_in_batch <= self.get_count_of_ready_hops():
+            results.append(self.process_hops(self.count_of_hops + self.hops_in_batch))
+        self.drop_processed_content()
+        return self.get_output(results)
+
+    def flush(self):
+        self.content = np.concatenate((self.content, np.zeros((self.window_size, self.content.shape[1]))))
+        count_of_hops = self.get_count_of_ready_hops()
+        results = []
+        while self.count_of_hops < count_of_hops:
+            results.append(self.process_hops(min(self.count_of_hops + self.hops_in_batch, count_of_hops)))
+        results.append(self.pop_result(self.result_offset + len(self.result)))
+        output = [self.get_output(results), self.get_converted(self.resampler.flush())]
+        missing = self.nframes - self.count_of_frames
+        if missing > 0:
+            output.append(np.zeros((missing, self.content.shape[1])))
+            self.count_of_frames = self.nframes
+        return np.concatenate(output)
+
+    def process_hops(self, last_hop):
+        hops = np.arange(self.count_of_hops, last_hop)
+        windows = sliding_window_view(self.content, self.window_size, axis=0)[hops * self.h - self.content_offset]
+        spectra = np.fft.rfft(self.hanning_window * windows, axis=2)
+        rephased = self.get_rephased_spectra(spectra, self.get_synthesis_position(np.arange(self.count_of_hops - 1,
+                                                                                           last_hop)))
+        frames = self.hanning_window * np.fft.irfft(rephased, n=self.window_size, axis=2)
+        self.add_to_result(self.get_synthesis_position(hops), frames)
+        self.count_of_hops = last_hop
+        return self.pop_result(int(self.get_synthesis_position(last_hop)))
+
+    def get_rephased_spectra(self, spectra, synthesis_positions):
+        spectra = spectra.astype(np.complex64)
+        magnitudes = np.abs(spectra)
+        phases = np.angle(spectra)
+        deviations = np.diff(phases, axis=0, prepend=self.phases[np.newaxis]) - self.expected_advances
+        steps = (np.diff(synthesis_positions) / self.h).astype(np.float32)[:, np.newaxis, np.newaxis]
+        advances = (self.expected_advances + get_wrapped(deviations)) * steps
+        advances = get_wrapped(advances).reshape(len(phases), -1)
+        if self.phase_locking:
+            synthesis_phases = self.get_locked_phases(advances, magnitudes, phases.reshape(len(phases), -1))
+        else:
+            synthesis_phases = self.synthesis_phases + np.cumsum(advances, axis=0)
+        synthesis_phases = get_wrapped(synthesis_phases)
+        self.synthesis_phases = synthesis_phases[-1]
+        synthesis_phases = synthesis_phases.reshape(phases.shape)
+        self.phases = phases[-1]
+        rephased = np.empty(spectra.shape, dtype=np.complex64)
+        rephased.real = magnitudes * np.cos(synthesis_phases)
+        rephased.imag = magnitudes * np.sin(synthesis_phases)
+        return rephased
+
+    def get_locked_phases(self, advances, magnitudes, phases):
+        peaks = get_nearest_peaks(magnitudes).reshape(phases.shape)
+        peaks -= np.arange(len(phases))[:, np.newaxis] * peaks.shape[1]
+        offsets = phases - np.take_along_axis(phases, peaks, axis=1)
+        synthesis_phases = np.empty(phases.shape, dtype=np.float32)
+        for i in range(len(phases)):
+            self.synthesis_phases = (self.synthesis_phases + advances[i])[peaks[i]] + offsets[i]
+            synthesis_phases[i] = self.synthesis_phases
+        return synthesis_phases
+
+    def add_to_result(self, starts, frames):
+        end = starts[-1] + self.window_size - self.result_offset
+        if end > len(self.result):
+            self.result = np.concatenate((self.result, np.zeros((end - len(self.result), self.result.shape[1]))))
+        for start, frame in zip(starts - self.result_offset, frames):
+            self.result[start:start + self.window_size] += frame.T
+
+    def pop_result(self, end):
+        start = self.result_offset
+        result = self.result[:end - start]
+        self.result = self.result[end - start:]
+        self.result_offset = end
+        return result[max(self.trim - start, 0):]
+
+    def get_output(self, results):
+        if not results:
+            return np.zeros((0, self.content.shape[1]))
+        return self.get_converted(self.resampler.process(np.concatenate(results) / self.window_gain))
+
+    def get_converted(self, values):
+        values = values[:self.nframes - self.count_of_frames]
+        self.count_of_frames += len(values)
+        return values
+
+    def drop_processed_content(self):
+        count_of_dropped = self.count_of_hops * self.h - self.content_offset
+        if count_of_dropped > 0:
+            self.content = self.content[count_of_dropped:]
+            self.content_offset += count_of_dropped
+
+
+@profiled
+def shift_pitch_values(values, factor, window_size=2 ** 13, h=2 ** 11, quality='linear', speed=1,
+                       phase_locking=True, block_size=2 ** 16):
+    shifter = PitchShifter(factor, len(values), values.shape[1], window_size, h, quality, speed, phase_locking)
+    blocks = [shifter.process(values[start:start + block_size]) for start in range(0, len(values), block_size)]
+    return np.concatenate(blocks + [shifter.flush()])
@@ -0,0 +1,200 @@
+import threading
+
+import numpy as np
+
+from sampleformat import samples_to_bytes
+from wavfile import WavReader
+from stream import StreamFormat, StreamEditor
+from timeline import Timeline
+from render import RenderGraph
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        self.data = np.zeros(capacity, dtype=np.uint8)
+        self.capacity = capacity
+        self.read_position = 0
+        self.write_position = 0
+
+    def get_count_of_available(self):
+        return self.write_position - self.read_position
+
+    def get_count_of_free(self):
+        return self.capacity - self.get_count_of_available()
+
+    def write(self, data):
+        data = np.frombuffer(data, dtype=np.uint8)
+        count = min(len(data), self.get_count_of_free())
+        start = self.write_position % self.capacity
+        first_count = min(count, self.capacity - start)
+        self.data[start:start + first_count] = data[:first_count]
+        self.data[:count - first_count] = data[first_count:count]
+        self.write_position += count
+        return count
+
+    def read(self, count):
+        count = min(count, self.get_count_of_available())
+        start = self.read_position % self.capacity
+        first_count = min(count, self.capacity - start)
+        data = self.data[start:start + first_count].tobytes() + self.data[:count - first_count].tobytes()
+        self.read_position += count
+        return data
+
+    def clear(self):
+        self.read_position = self.write_position
+
+
+class FileSource:
+    def __init__(self, file_name):
+        self.file_name = file_name
+        wav = WavReader(file_name)
+        self.nchannels = wav.nchannels
+        self.sampwidth = wav.sampwidth
+        self.framerate = wav.framerate
+        self.nframes = wav.nframes
+        wav.close()
+
+    def get_blocks(self, block_size, position=0):
+        wav = WavReader(self.file_name)
+        for start in range(position, wav.nframes, block_size):
+            yield wav.get_samples(start, start + block_size)
+        wav.close()
+
+
+class ArraySource:
+    def __init__(self, samples, sampwidth, framerate):
+        self.samples = samples
+        self.nchannels = samples.shape[1]
+        self.sampwidth = sampwidth
+        self.framerate = framerate
+        self.nframes = len(samples)
+
+    def get_blocks(self, block_size, position=0):
+        for start in range(position, self.nframes, block_size):
+            yield self.samples[start:start + block_size]
+
+
+class StreamSource:
+    def __init__(self, stream_format, get_chain_blocks):
+        self.nchannels, self.sampwidth, self.framerate, self.nframes = stream_format
+        self.get_chain_blocks = get_chain_blocks
+
+    def get_blocks(self, block_size, position=0):
+        for block in self.get_chain_blocks():
+            count_of_skipped_frames = min(position, len(block))
+            position -= count_of_skipped_frames
+            for start in range(count_of_skipped_frames, len(block), block_size):
+                yield block[start:start + block_size]
+
+
+def get_source(audio_editor):
+    if isinstance(audio_editor, str):
+        return FileSource(audio_editor)
+    if isinstance(audio_editor, StreamEditor):
+        audio_editor.calibrate()
+        return StreamSource(audio_editor.start_processors(audio_editor.processors),
+                            lambda: audio_editor.get_blocks(audio_editor.processors))
+    if isinstance(audio_editor, Timeline):
+        return StreamSource(StreamFormat(audio_editor.nchannels, audio_editor.sampwidth, audio_editor.framerate,
+                                         audio_editor.nframes), audio_editor.get_blocks)
+    if isinstance(audio_editor, RenderGraph):
+        audio_editor.render()
+        audio_editor = audio_editor.audio_editor
+    return ArraySource(audio_editor.samples, audio_editor.sampwidth, audio_editor.framerate)
+
+
+class PlaybackEngine:
+    def __init__(self, source, buffer_frames=2 ** 16, latency=0.05, block_frames=2 ** 12):
+        self.source = source
+        self.frame_size = source.nchannels * source.sampwidth
+        self.silence = b'\x80' if source.sampwidth == 1 else b'\x00'
+        self.buffer_frames = buffer_frames
+        self.latency = latency
+        self.block_frames = block_frames
+        self.ring_buffer = RingBuffer(buffer_frames * self.frame_size)
+        self.space_available = threading.Event()
+        self.data_available = threading.Event()
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+        self.position = 0
+        self.end_of_source = False
+        self.stopped = False
+        self.producer = None
+        self.count_of_underruns = 0
+        self.count_of_silent_frames = 0
+
+    @property
+    def frames_per_buffer(self):
+        return max(int(self.latency * self.source.framerate), 1)
+
+    def start(self, prefill_frames=None, position=0):
+        self.stop()
+        with self.lock:
+            self.ring_buffer.clear()
+            self.position = position
+            self.end_of_source = False
+            self.finished.clear()
+        self.stopped = False
+        self.data_available.clear()
+        self.producer = threading.Thread(target=self.produce, args=(position,))
+        self.producer.daemon = True
+        self.producer.start()
+        if prefill_frames is None:
+            prefill_frames = min(self.frames_per_buffer * 2, self.buffer_frames)
+        while (self.ring_buffer.get_count_of_available() < prefill_frames * self.frame_size and
+               not self.end_of_source):
+            self.data_available.wait(0.1)
+            self.data_available.clear()
+
+    def produce(self, position):
+        try:
+            for block in self.source.get_blocks(self.block_frames, position):
+                data = samples_to_bytes(block, self.source.sampwidth)
+                while data:
+                    if self.stopped:
+                        return
+                    count = self.ring_buffer.write(data)
+                    data = data[count:]
+                    self.data_available.set()
+                    if data:
+                        self.space_available.wait(0.1)
+                        self.space_available.clear()
+        finally:
+            if not self.stopped:
+                self.end_of_source = True
+            self.data_available.set()
+
+    def read(self, frame_count):
+        with self.lock:
+            count_of_available = self.ring_buffer.get_count_of_available()
+            data = self.ring_buffer.read(min(frame_count * self.frame_size,
+                                             count_of_available - count_of_available % self.frame_size))
+            self.position += len(data) // self.frame_size
+            is_finished = (len(data) < frame_count * self.frame_size and self.end_of_source and
+                           not self.ring_buffer.get_count_of_available())
+            if is_finished:
+                self.finished.set()
+        self.space_available.set()
+        if is_finished:
+            return data
+        if len(data) < frame_count * self.frame_size:
+            self.count_of_underruns += 1
+            self.count_of_silent_frames += frame_count - len(data) // self.frame_size
+            data += self.silence * (frame_count * self.frame_size - len(data))
+        return data
+
+    def is_finished(self):
+        return self.finished.is_set()
+
+    def stop(self):
+        self.stopped = True
+        self.space_available.set()
+        if self.producer is not None:
+            self.producer.join()
+            self.producer = None
+
+    def rewind(self):
+        self.start()
+
+    def seek(self, position):
+        self.start(self.frames_per_buffer, min(max(int(position), 0), self.source.nframes))
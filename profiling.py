@@ -0,0 +1,99 @@
+import json
+import time
+import functools
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class Profiler:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = OrderedDict()
+        self.running_peaks = []
+        self.start_time = time.perf_counter()
+        self.start_cpu_time = time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def measure(self, name):
+        measurement = {'samples': 0}
+        if self.trace_memory:
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            if self.running_peaks:
+                self.running_peaks[-1] = max(self.running_peaks[-1], peak_memory)
+            tracemalloc.reset_peak()
+            self.running_peaks.append(current_memory)
+        wall_time = time.perf_counter()
+        cpu_time = time.process_time()
+        try:
+            yield measurement
+        finally:
+            wall_time = time.perf_counter() - wall_time
+            cpu_time = time.process_time() - cpu_time
+            peak_memory = 0
+            if self.trace_memory:
+                peak_memory = max(self.running_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self.running_peaks:
+                    self.running_peaks[-1] = max(self.running_peaks[-1], peak_memory)
+                peak_memory -= current_memory
+            self.add_record(name, wall_time, cpu_time, peak_memory, measurement['samples'])
+
+    def add_record(self, name, wall_time, cpu_time, peak_memory, count_of_samples):
+        record = self.records.setdefault(name, {'calls': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'peak_memory': 0,
+                                                'samples': 0})
+        record['calls'] += 1
+        record['wall_time'] += wall_time
+        record['cpu_time'] += cpu_time
+        record['peak_memory'] = max(record['peak_memory'], peak_memory)
+        record['samples'] += count_of_samples
+
+    def get_report(self):
+        operations = OrderedDict()
+        for name, record in self.records.items():
+            operations[name] = dict(record, samples_per_second=record['samples'] / record['wall_time']
+                                    if record['wall_time'] else 0.0)
+        return {'wall_time': time.perf_counter() - self.start_time,
+                'cpu_time': time.process_time() - self.start_cpu_time,
+                'operations': operations}
+
+    def write_report(self, file_name):
+        with open(file_name, 'w', encoding='utf-8') as file:
+            json.dump(self.get_report(), file, indent=4)
+
+
+profiler = None
+
+
+def enable_profiling(trace_memory=True):
+    global profiler
+    profiler = Profiler(trace_memory)
+    return profiler
+
+
+def disable_profiling():
+    global profiler
+    if profiler is not None and profiler.trace_memory:
+        tracemalloc.stop()
+    profiler = None
+
+
+def get_count_of_samples(args):
+    if not args:
+        return 0
+    audio_editor = getattr(args[0], 'audio_editor', args[0])
+    return getattr(getattr(audio_editor, 'samples', audio_editor), 'size', 0)
+
+
+def profiled(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if profiler is None:
+            return function(*args, **kwargs)
+        count_of_samples = get_count_of_samples(args)
+        with profiler.measure(function.__qualname__) as measurement:
+            result = function(*args, **kwargs)
+            measurement['samples'] = max(count_of_samples, get_count_of_samples(args))
+        return result
+    return wrapper
@@ -0,0 +1,144 @@
+from collections import namedtuple
+
+import numpy as np
+
+from sampleformat import samples_to_float, float_to_samples, get_peak
+from gain import db_to_gain
+from resample import resample_values, get_best_quality
+from pitch import get_pitch_factor, get_analysis_hop, shift_pitch_values
+from profiling import profiled
+
+
+Gain = namedtuple('Gain', ['gain'])
+Speed = namedtuple('Speed', ['factor', 'quality'])
+Temp = namedtuple('Temp', ['factor', 'window_size', 'h'])
+Pitch = namedtuple('Pitch', ['factor', 'window_size', 'h', 'quality', 'speed'])
+Pitch.__new__.__defaults__ = (1,)
+
+
+def is_attenuation(gain):
+    return np.all(gain <= 1)
+
+
+def is_amplification(gain):
+    return np.all(gain >= 1)
+
+
+def get_pitch_with_speed(pitch, speed):
+    return pitch._replace(speed=pitch.speed * speed.factor, quality=get_best_quality(pitch.quality, speed.quality))
+
+
+def get_pitch_after_speed(pitch, speed):
+    window_size = pitch.window_size * speed.factor
+    h = pitch.h * speed.factor
+    if (not float(window_size).is_integer() or not float(h).is_integer() or
+            get_analysis_hop(pitch.factor, int(h)) != get_analysis_hop(pitch.factor, pitch.h) * speed.factor):
+        return None
+    return [get_pitch_with_speed(pitch._replace(window_size=int(window_size), h=int(h)), speed)]
+
+
+def get_fused_pair(first, second):
+    if (isinstance(first, Gain) and isinstance(second, Gain) and
+            (is_attenuation(first.gain) and is_attenuation(second.gain) or
+             is_amplification(first.gain) and is_amplification(second.gain))):
+        return [Gain(first.gain * second.gain)]
+    if isinstance(first, Gain) and is_attenuation(first.gain) and isinstance(second, Temp):
+        return [second]
+    if isinstance(first, Speed) and isinstance(second, Speed):
+        return [Speed(first.factor * second.factor, get_best_quality(first.quality, second.quality))]
+    if isinstance(first, Speed) and isinstance(second, Pitch):
+        return get_pitch_after_speed(second, first)
+    if isinstance(first, Pitch) and isinstance(second, Speed):
+        return [get_pitch_with_speed(first, second)]
+    return None
+
+
+def is_identity(operation):
+    if isinstance(operation, Gain):
+        return np.all(operation.gain == 1)
+    if isinstance(operation, Pitch):
+        return operation.factor == 1 and operation.speed == 1
+    return operation.factor == 1
+
+
+def quantize(operation, values, peak):
+    if isinstance(operation, (Speed, Pitch)):
+        np.round(values, out=values)
+    else:
+        np.trunc(values, out=values)
+    np.clip(values, -peak, peak - 1, out=values)
+
+
+def fuse(operations):
+    operations = [operation for operation in operations if not is_identity(operation)]
+    i = 0
+    while i < len(operations) - 1:
+        fused_pair = get_fused_pair(operations[i], operations[i + 1])
+        if fused_pair is None:
+            i += 1
+            continue
+        fused_pair = [operation for operation in fused_pair if not is_identity(operation)]
+        operations[i:i + 2] = fused_pair
+        i = max(i - 1, 0)
+    return operations
+
+
+class RenderGraph:
+    def __init__(self, audio_editor, block_size=2 ** 16):
+        self.audio_editor = audio_editor
+        self.block_size = block_size
+        self.operations = []
+
+    def change_volume(self, volume_in_dB):
+        self.operations.append(Gain(db_to_gain(volume_in_dB)))
+
+    def change_speed(self, factor, quality='linear'):
+        self.operations.append(Speed(factor, quality))
+
+    def change_temp(self, factor, window_size=2 ** 13, h=2 ** 11):
+        self.operations.append(Temp(factor, window_size, h))
+
+    def change_pitch(self, pitch_in_semitone, window_size=2 ** 13, h=2 ** 11, quality='linear'):
+        if pitch_in_semitone < -12 or pitch_in_semitone > 12:
+            return
+        self.operations.append(Pitch(get_pitch_factor(pitch_in_semitone), window_size, h, quality))
+
+    def mix(self, tracks, limit_in_dB=-1.0):
+        self.render()
+        self.audio_editor.mix(tracks, limit_in_dB, self.block_size)
+
+    def normalize(self, target_lufs=None, target_peak=None):
+        self.render()
+        volume_in_dB = self.audio_editor.get_normalization_gain(target_lufs, target_peak)
+        if np.isfinite(volume_in_dB):
+            self.operations.append(Gain(db_to_gain(volume_in_dB)))
+
+    @profiled
+    def render(self):
+        operations = fuse(self.operations)
+        self.operations = []
+        if not operations:
+            return
+        peak = get_peak(self.audio_editor.sampwidth)
+        values = None
+        for operation in operations:
+            if isinstance(operation, Temp):
+                channels = None if values is None else [values[:, n] for n in range(values.shape[1])]
+                values = np.column_stack(self.audio_editor.change_temp_for_each_channel_and_get_samples(
+                    operation.factor, operation.window_size, operation.h, channels))
+            else:
+                if values is None:
+                    values = samples_to_float(self.audio_editor.samples, self.audio_editor.sampwidth)
+                if isinstance(operation, Speed):
+                    values = resample_values(values, operation.factor, operation.quality, self.block_size)
+                elif isinstance(operation, Pitch):
+                    values = shift_pitch_values(values, operation.factor, operation.window_size, operation.h,
+                                                operation.quality, operation.speed, block_size=self.block_size)
+                else:
+                    values *= operation.gain
+            quantize(operation, values, peak)
+        self.audio_editor.samples = float_to_samples(values, self.audio_editor.sampwidth)
+
+    def write_changes_to_new_file(self, new_name=None):
+        self.render()
+        self.audio_editor.write_changes_to_new_file(new_name)
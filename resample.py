@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from sampleformat import samples_to_float, float_to_samples
+from profiling import profiled
+
+
+class Resampler:
+    left = 0
+    right = 0
+
+    def __init__(self, factor, nframes, nchannels):
+        self.factor = factor
+        self.nframes = nframes
+        self.count_of_frames = 0
+        self.content = np.zeros((self.left, nchannels))
+        self.content_offset = -self.left
+
+    def get_count_of_frames(self):
+        return round(self.nframes / self.factor)
+
+    def process(self, values):
+        self.content = np.concatenate((self.content, values))
+        length = self.content_offset + len(self.content)
+        count_of_ready_frames = max(math.floor((length - self.right - 1) / self.factor) + 1, 0)
+        return self.get_resampled(min(count_of_ready_frames, self.get_count_of_frames()))
+
+    def flush(self):
+        self.content = np.concatenate((self.content, self.get_padding()))
+        return self.get_resampled(self.get_count_of_frames())
+
+    def get_padding(self):
+        return np.zeros((self.right, self.content.shape[1]))
+
+    def get_resampled(self, count_of_frames):
+        positions = np.arange(self.count_of_frames, count_of_frames) * self.factor
+        values = self.interpolate(positions)
+        self.count_of_frames = max(count_of_frames, self.count_of_frames)
+        count_of_dropped = min(int(self.count_of_frames * self.factor) - self.left - self.content_offset,
+                               len(self.content))
+        if count_of_dropped > 0:
+            self.content = self.content[count_of_dropped:]
+            self.content_offset += count_of_dropped
+        return values
+
+    def interpolate(self, positions):
+        raise NotImplementedError
+
+
+class NearestResampler(Resampler):
+    right = 1
+
+    def get_padding(self):
+        return self.content[-1:] if len(self.content) else super().get_padding()
+
+    def interpolate(self, positions):
+        return self.content[np.floor(positions + 0.5).astype(np.int64) - self.content_offset]
+
+
+class LinearResampler(Resampler):
+    right = 1
+
+    def get_padding(self):
+        return self.content[-1:] if len(self.content) else super().get_padding()
+
+    def interpolate(self, positions):
+        indices = np.floor(positions).astype(np.int64)
+        fractions = (positions - indices)[:, np.newaxis]
+        indices -= self.content_offset
+        lower = self.content[indices]
+        return lower + (self.content[indices + 1] - lower) * fractions
+
+
+class SincResampler(Resampler):
+    def __init__(self, factor, nframes, nchannels, zero_crossings=16, phases=512):
+        cutoff = min(1, 1 / factor)
+        self.half = math.ceil(zero_crossings / cutoff)
+        self.left = self.half - 1
+        self.right = self.half + 1
+        super().__init__(factor, nframes, nchannels)
+        self.phases = phases
+        self.table = get_sinc_table(cutoff, self.half, phases)
+
+    def interpolate(self, positions):
+        indices = np.floor(positions * self.phases + 0.5).astype(np.int64)
+        starts = indices // self.phases - self.left - self.content_offset
+        windows = sliding_window_view(self.content, 2 * self.half, axis=0)[starts]
+        return np.einsum('nct,nt->nc', windows, self.table[indices % self.phases])
+
+
+def get_sinc_table(cutoff, half, phases):
+    distances = np.arange(1 - half, half + 1) - np.arange(phases)[:, np.newaxis] / phases
+    table = cutoff * np.sinc(cutoff * distances) * (0.5 + 0.5 * np.cos(np.pi * np.clip(distances / half, -1, 1)))
+    return table / table.sum(axis=1, keepdims=True)
+
+
+resamplers = {
+    'nearest': NearestResampler,
+    'linear': LinearResampler,
+    'sinc': SincResampler
+}
+
+
+def get_resampler(factor, nframes, nchannels, quality='linear'):
+    if quality not in resamplers:
+        raise ValueError('Unknown resampling quality {}, use one of {}'.format(quality, ', '.join(resamplers)))
+    return resamplers[quality](factor, nframes, nchannels)
+
+
+def get_best_quality(first_quality, second_quality):
+    qualities = list(resamplers)
+    return qualities[max(qualities.index(first_quality), qualities.index(second_quality))]
+
+
+@profiled
+def resample_values(values, factor, quality='linear', block_size=2 ** 16):
+    resampler = get_resampler(factor, len(values), values.shape[1], quality)
+    blocks = [resampler.process(values[start:start + block_size]) for start in range(0, len(values), block_size)]
+    return np.concatenate(blocks + [resampler.flush()])
+
+
+def resample(samples, factor, sampwidth, quality='linear', block_size=2 ** 16):
+    values = resample_values(samples_to_float(samples, sampwidth), factor, quality, block_size)
+    return float_to_samples(np.round(values), sampwidth)
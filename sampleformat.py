@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+
+
+sample_types = {
+    1: np.dtype('u1'),
+    2: np.dtype('<i2'),
+    3: np.dtype('<i4'),
+    4: np.dtype('<i4')
+}
+
+
+def get_peak(sampwidth):
+    return 256 ** sampwidth / 2
+
+
+def get_offset(sampwidth):
+    if sampwidth == 1:
+        return 128
+    return 0
+
+
+def milliseconds_to_frames(position_in_milliseconds, framerate):
+    return math.floor(position_in_milliseconds * framerate / 1000 + 0.5)
+
+
+def bytes_to_samples(data, sampwidth, nchannels):
+    if sampwidth == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = np.zeros(len(raw), dtype=sample_types[3])
+        samples.view(np.uint8).reshape(-1, 4)[:, 1:] = raw
+        samples >>= 8
+    else:
+        samples = np.frombuffer(data, dtype=sample_types[sampwidth])
+    return samples.reshape(-1, nchannels)
+
+
+def samples_to_bytes(samples, sampwidth):
+    samples = np.ascontiguousarray(samples, dtype=sample_types[sampwidth])
+    if sampwidth == 3:
+        return samples.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return samples.tobytes()
+
+
+def samples_to_float(samples, sampwidth):
+    return samples.astype(np.float64) - get_offset(sampwidth)
+
+
+def float_to_samples(values, sampwidth):
+    peak = get_peak(sampwidth)
+    values = np.clip(np.trunc(values), -peak, peak - 1) + get_offset(sampwidth)
+    return values.astype(sample_types[sampwidth])
+
+
+def get_samples_with_added_channels(samples, nchannels):
+    return samples[:, np.arange(nchannels) % samples.shape[1]]
+
+
+def get_channel_matrix(nchannels, new_nchannels):
+    matrix = np.zeros((nchannels, new_nchannels))
+    if new_nchannels >= nchannels:
+        matrix[np.arange(new_nchannels) % nchannels, np.arange(new_nchannels)] = 1
+    else:
+        matrix[np.arange(nchannels), np.arange(nchannels) % new_nchannels] = 1
+        matrix /= matrix.sum(axis=0)
+    return matrix
+
+
+def get_converted_channels(samples, sampwidth, new_nchannels, matrix=None):
+    if matrix is None:
+        if new_nchannels >= samples.shape[1]:
+            return get_samples_with_added_channels(samples, new_nchannels)
+        matrix = get_channel_matrix(samples.shape[1], new_nchannels)
+    return float_to_samples(np.round(samples_to_float(samples, sampwidth) @ matrix), sampwidth)
+
+
+def get_converted_sampwidth(samples, sampwidth, new_sampwidth):
+    if sampwidth == new_sampwidth:
+        return samples
+    values = samples.astype(np.int32) - get_offset(sampwidth)
+    if new_sampwidth > sampwidth:
+        values <<= 8 * (new_sampwidth - sampwidth)
+    else:
+        values >>= 8 * (sampwidth - new_sampwidth)
+    return (values + get_offset(new_sampwidth)).astype(sample_types[new_sampwidth])
+
+
+def get_converted_samples(samples, sampwidth, new_nchannels, new_sampwidth, matrix=None):
+    if new_nchannels < samples.shape[1] or matrix is not None:
+        samples = get_converted_channels(samples, sampwidth, new_nchannels, matrix)
+        return get_converted_sampwidth(samples, sampwidth, new_sampwidth)
+    samples = get_converted_sampwidth(samples, sampwidth, new_sampwidth)
+    return get_converted_channels(samples, new_sampwidth, new_nchannels)
+
+
+def samples_to_float32(samples, sampwidth):
+    return (samples.astype(np.float32) - get_offset(sampwidth)) * np.float32(1 / get_peak(sampwidth))
+
+
+def float32_to_samples(values, sampwidth):
+    return float_to_samples(np.round(values.astype(np.float64) * get_peak(sampwidth)), sampwidth)
@@ -0,0 +1,88 @@
+import numpy as np
+
+from sampleformat import samples_to_float32, milliseconds_to_frames
+from profiling import profiled
+
+
+envelopes = ['rms', 'peak']
+
+
+def get_levels(values, window_size, envelope='rms'):
+    windows = values.reshape(len(values) // window_size, window_size * values.shape[1])
+    if envelope == 'peak':
+        levels = np.maximum(windows.max(axis=1), -windows.min(axis=1)) ** 2
+    else:
+        levels = np.einsum('ij,ij->i', windows, windows) / windows.shape[1]
+    with np.errstate(divide='ignore'):
+        return 10 * np.log10(levels)
+
+
+class SilenceDetector:
+    def __init__(self, sampwidth, framerate, threshold_in_dB=-40, min_silence_in_milliseconds=500,
+                 window_in_milliseconds=20, envelope='rms'):
+        if envelope not in envelopes:
+            raise ValueError('Unknown envelope {}, use one of {}'.format(envelope, ', '.join(envelopes)))
+        self.sampwidth = sampwidth
+        self.threshold_in_dB = threshold_in_dB
+        self.min_silence = milliseconds_to_frames(min_silence_in_milliseconds, framerate)
+        self.window_size = max(milliseconds_to_frames(window_in_milliseconds, framerate), 1)
+        self.envelope = envelope
+        self.remainder = None
+        self.count_of_frames = 0
+        self.silence_start = None
+        self.regions = []
+
+    def process(self, samples):
+        values = samples_to_float32(samples, self.sampwidth)
+        if self.remainder is not None:
+            values = np.concatenate((self.remainder, values))
+        end = len(values) // self.window_size * self.window_size
+        self.add_levels(get_levels(values[:end], self.window_size, self.envelope))
+        self.remainder = values[end:]
+
+    def flush(self):
+        if self.remainder is not None and len(self.remainder):
+            self.add_levels(get_levels(self.remainder, len(self.remainder), self.envelope), len(self.remainder))
+            self.remainder = None
+        if self.silence_start is not None:
+            self.add_region(self.silence_start, self.count_of_frames)
+            self.silence_start = None
+        return self.regions
+
+    def add_levels(self, levels, window_size=None):
+        window_size = window_size or self.window_size
+        is_silent = np.concatenate(([self.silence_start is not None], levels < self.threshold_in_dB))
+        changes = np.flatnonzero(np.diff(is_silent.astype(np.int8))) * window_size + self.count_of_frames
+        if self.silence_start is not None:
+            changes = np.concatenate(([self.silence_start], changes))
+        self.count_of_frames += len(levels) * window_size
+        if len(changes) % 2:
+            self.silence_start = int(changes[-1])
+            changes = changes[:-1]
+        else:
+            self.silence_start = None
+        for start, end in changes.reshape(-1, 2):
+            self.add_region(int(start), int(end))
+
+    def add_region(self, start, end):
+        if end - start >= self.min_silence:
+            self.regions.append((start, end))
+
+
+def get_cut_points(regions, nframes):
+    return [(start + end) // 2 for start, end in regions if start > 0 and end < nframes]
+
+
+@profiled
+def detect_silence(blocks, sampwidth, framerate, threshold_in_dB=-40, min_silence_in_milliseconds=500,
+                   window_in_milliseconds=20, envelope='rms'):
+    detector = SilenceDetector(sampwidth, framerate, threshold_in_dB, min_silence_in_milliseconds,
+                               window_in_milliseconds, envelope)
+    for block in blocks:
+        detector.process(block)
+    return detector.flush()
+
+
+def get_blocks(samples, block_size=2 ** 16):
+    for start in range(0, len(samples), block_size):
+        yield samples[start:start + block_size]
@@ -0,0 +1,239 @@
+from collections import namedtuple
+
+import numpy as np
+
+from sampleformat import sample_types, samples_to_float, float_to_samples, get_samples_with_added_channels, \
+    get_converted_sampwidth
+from gain import db_to_gain, apply_gain
+from resample import get_resampler
+from vocoder import PhaseVocoder, get_normalized
+from pitch import PitchShifter, get_pitch_factor
+from wavfile import WavReader, WavWriter, get_new_file_name
+from profiling import profiled
+
+
+StreamFormat = namedtuple('StreamFormat', ['nchannels', 'sampwidth', 'framerate', 'nframes'])
+
+
+class StreamProcessor:
+    needs_calibration = False
+
+    def __init__(self):
+        self.input_format = None
+        self.output_format = None
+
+    def start(self, input_format):
+        self.input_format = input_format
+        self.output_format = self.get_output_format(input_format)
+        return self.output_format
+
+    def get_output_format(self, input_format):
+        return input_format
+
+    def process(self, block):
+        return block
+
+    def flush(self):
+        return np.zeros((0, self.output_format.nchannels), dtype=sample_types[self.output_format.sampwidth])
+
+
+class VolumeProcessor(StreamProcessor):
+    def __init__(self, volume_in_dB):
+        super().__init__()
+        self.gain = db_to_gain(volume_in_dB)
+
+    def process(self, block):
+        return apply_gain(block, self.gain, self.input_format.sampwidth)
+
+
+class SpeedProcessor(StreamProcessor):
+    def __init__(self, factor, quality='linear'):
+        super().__init__()
+        self.factor = factor
+        self.quality = quality
+        self.resampler = None
+
+    def start(self, input_format):
+        self.resampler = get_resampler(self.factor, input_format.nframes, input_format.nchannels, self.quality)
+        return super().start(input_format)
+
+    def get_output_format(self, input_format):
+        return input_format._replace(nframes=self.resampler.get_count_of_frames())
+
+    def process(self, block):
+        return self.get_converted(self.resampler.process(samples_to_float(block, self.input_format.sampwidth)))
+
+    def flush(self):
+        return self.get_converted(self.resampler.flush())
+
+    def get_converted(self, values):
+        return float_to_samples(np.round(values), self.output_format.sampwidth)
+
+
+class ChannelsProcessor(StreamProcessor):
+    def __init__(self, count_of_channels):
+        super().__init__()
+        self.count_of_channels = count_of_channels
+
+    def get_output_format(self, input_format):
+        return input_format._replace(nchannels=input_format.nchannels + self.count_of_channels)
+
+    def process(self, block):
+        return get_samples_with_added_channels(block, self.output_format.nchannels)
+
+
+class SampleWidthProcessor(StreamProcessor):
+    def __init__(self, sampwidth):
+        super().__init__()
+        self.sampwidth = sampwidth
+
+    def get_output_format(self, input_format):
+        return input_format._replace(sampwidth=input_format.sampwidth + self.sampwidth)
+
+    def process(self, block):
+        return get_converted_sampwidth(block, self.input_format.sampwidth, self.output_format.sampwidth)
+
+
+class TempProcessor(StreamProcessor):
+    needs_calibration = True
+
+    def __init__(self, factor, window_size=2 ** 13, h=2 ** 11):
+        super().__init__()
+        self.factor = factor
+        self.window_size = window_size
+        self.h = h
+        self.vocoders = []
+        self.maximum = None
+        self.observed_maximum = None
+
+    def start(self, input_format):
+        self.vocoders = [PhaseVocoder(self.factor, self.window_size, self.h) for _ in range(input_format.nchannels)]
+        return super().start(input_format)
+
+    def get_output_format(self, input_format):
+        return input_format._replace(nframes=int(input_format.nframes / self.factor) + self.window_size)
+
+    def start_calibration(self):
+        self.maximum = None
+        self.observed_maximum = -np.inf
+
+    def finish_calibration(self):
+        self.maximum = self.observed_maximum
+
+    def process(self, block):
+        return self.get_converted([vocoder.process(block[:, n]) for n, vocoder in enumerate(self.vocoders)])
+
+    def flush(self):
+        return self.get_converted([vocoder.flush() for vocoder in self.vocoders])
+
+    def get_converted(self, channels):
+        result = np.column_stack(channels)
+        if self.maximum is None:
+            if len(result):
+                self.observed_maximum = np.maximum(self.observed_maximum, result.max(axis=0))
+            return result
+        return float_to_samples(get_normalized(result, self.maximum), self.output_format.sampwidth)
+
+
+class PitchProcessor(StreamProcessor):
+    def __init__(self, factor, window_size=2 ** 13, h=2 ** 11, quality='linear'):
+        super().__init__()
+        self.factor = factor
+        self.window_size = window_size
+        self.h = h
+        self.quality = quality
+        self.shifter = None
+
+    def start(self, input_format):
+        self.shifter = PitchShifter(self.factor, input_format.nframes, input_format.nchannels, self.window_size,
+                                    self.h, self.quality)
+        return super().start(input_format)
+
+    def process(self, block):
+        return self.get_converted(self.shifter.process(samples_to_float(block, self.input_format.sampwidth)))
+
+    def flush(self):
+        return self.get_converted(self.shifter.flush())
+
+    def get_converted(self, values):
+        return float_to_samples(np.round(values), self.output_format.sampwidth)
+
+
+class StreamEditor:
+    def __init__(self, file_name, block_size=2 ** 16):
+        self.file_name = file_name
+        self.block_size = block_size
+        self.processors = []
+
+        wav = WavReader(file_name)
+        self.input_format = StreamFormat(wav.nchannels, wav.sampwidth, wav.framerate, wav.nframes)
+        wav.close()
+
+    def add_channels_into_frames(self, count_of_channels):
+        self.processors.append(ChannelsProcessor(count_of_channels))
+
+    def extend_samples(self, sampwidth):
+        self.processors.append(SampleWidthProcessor(sampwidth))
+
+    def change_volume(self, volume_in_dB):
+        if np.all(np.asarray(volume_in_dB) == 0):
+            return
+        self.processors.append(VolumeProcessor(volume_in_dB))
+
+    def change_speed(self, factor, quality='linear'):
+        if factor == 1:
+            return
+        self.processors.append(SpeedProcessor(factor, quality))
+
+    def change_temp(self, factor, window_size=2**13, h=2**11):
+        if factor == 1:
+            return
+        self.processors.append(TempProcessor(factor, window_size, h))
+
+    def change_pitch(self, pitch_in_semitone, window_size=2 ** 13, h=2 ** 11, quality='linear'):
+        if pitch_in_semitone == 0 or pitch_in_semitone < -12 or pitch_in_semitone > 12:
+            return
+        self.processors.append(PitchProcessor(get_pitch_factor(pitch_in_semitone), window_size, h, quality))
+
+    def start_processors(self, processors):
+        stream_format = self.input_format
+        for processor in processors:
+            stream_format = processor.start(stream_format)
+        return stream_format
+
+    def get_blocks(self, processors):
+        self.start_processors(processors)
+        wav = WavReader(self.file_name)
+        for start in range(0, wav.nframes, self.block_size):
+            yield self.process_block(wav.get_samples(start, start + self.block_size), processors)
+        wav.close()
+        for i in range(len(processors)):
+            yield self.process_block(processors[i].flush(), processors[i + 1:])
+
+    def process_block(self, block, processors):
+        for processor in processors:
+            block = processor.process(block)
+        return block
+
+    @profiled
+    def calibrate(self):
+        for i in range(len(self.processors)):
+            if self.processors[i].needs_calibration:
+                self.processors[i].start_calibration()
+                for _ in self.get_blocks(self.processors[:i + 1]):
+                    pass
+                self.processors[i].finish_calibration()
+
+    @profiled
+    def write_changes_to_new_file(self, new_name=None):
+        self.calibrate()
+        if new_name is None:
+            new_name = get_new_file_name(self.file_name, 'changing_')
+        output_format = self.start_processors(self.processors)
+        new_file = WavWriter(new_name, output_format.nchannels, output_format.sampwidth, output_format.framerate,
+                             output_format.nframes)
+        position = 0
+        for block in self.get_blocks(self.processors):
+            new_file.write(position, block)
+            position += len(block)
+        new_file.close()
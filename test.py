@@ -1,7 +1,31 @@
-from unittest import TestCase, main
+from unittest import TestCase, main, mock
 import numpy as np
 import copy
+import os
+import wave
+import time
+import json
+import shutil
+import tempfile
+import threading
 from audioeditor import AudioEditor
+from stream import StreamEditor
+from timeline import Timeline
+from render import RenderGraph, Gain, Speed, Temp, Pitch, fuse
+from gain import db_to_gain
+from batch import get_jobs, run_jobs, process_file
+from cache import enable_cache, disable_cache, get_file_key
+from wavfile import WavReader, WavWriter
+from vocoder import PhaseVocoder, stretch_hop_by_hop
+from sampleformat import get_converted_samples, samples_to_float32, float32_to_samples
+from playback import RingBuffer, FileSource, ArraySource, PlaybackEngine, get_source
+from peaks import PeakIndex, get_peak_index, get_sidecar_name
+from profiling import enable_profiling, disable_profiling
+from benchmark_suite import generate_wav, run_operation, get_regressions
+from pitch import shift_pitch_values, get_pitch_factor
+from loudness import measure_loudness
+from silence import detect_silence, get_blocks, get_cut_points
+from mixer import MixTrack, mix_files
 
 
 class TestAudioEditor(TestCase):
@@ -26,7 +50,7 @@ class TestAudioEditor(TestCase):
         for i in range(len(s.frames)):
             self.assertEqual(3, len(s.frames[i]))
             difference = s.sampwidth - old_sampwidth
-            self.assertEqual(old_frames[i] + b'\xff'*difference, s.frames[i])
+            self.assertEqual(b'\x00'*difference + old_frames[i], s.frames[i])
 
     def test_get_separated_frame_in_samples(self):
         s1 = AudioEditor('bowl.wav')
@@ -72,9 +96,27 @@ class TestAudioEditor(TestCase):
     def test_split_and_get_two_frames(self):
         s = AudioEditor('обычный.wav')
         frames = s.split_and_get_two_frames(3000)
-        self.assertEqual(frames[0] + frames[1], s.frames)
+        self.assertEqual(2, len(frames))
+        self.assertTrue(np.array_equal(np.concatenate(frames), s.samples))
         self.assertEqual(len(frames[0]) + len(frames[1]), len(s.frames))
 
+    def test_split_and_get_frames(self):
+        s = AudioEditor('обычный.wav')
+        frames = s.split_and_get_frames([2000, 0, 1000.01, 2000, 10 ** 9])
+        self.assertEqual([44100, 44100, s.nframes - 88200], [len(samples) for samples in frames])
+        self.assertTrue(np.array_equal(np.concatenate(frames), s.samples))
+        self.assertEqual(1, len(s.split_and_get_frames(0)))
+
+    def test_split_and_write_result_in_new_files(self):
+        directory = tempfile.TemporaryDirectory()
+        s = AudioEditor('bowl.wav')
+        s.file_name = os.path.join(directory.name, 'bowl.wav')
+        s.split_and_write_result_in_new_files([100, 200, 300])
+        self.assertEqual(['splitting_{}_bowl.wav'.format(i) for i in range(1, 5)], sorted(os.listdir(directory.name)))
+        s4 = AudioEditor(os.path.join(directory.name, 'splitting_4_bowl.wav'))
+        self.assertTrue(np.array_equal(s.samples[14400:], s4.samples))
+        directory.cleanup()
+
     def test_write_changes_to_two_new_file(self):
         s = AudioEditor('обычный.wav')
         frames = s.split_and_get_two_frames(6000)
@@ -82,9 +124,9 @@ class TestAudioEditor(TestCase):
         s1 = AudioEditor('first_splitting_обычный.wav')
         s2 = AudioEditor('second_splitting_обычный.wav')
         self.assertEqual(s.sampwidth, s1.sampwidth, s2.sampwidth)
-        self.assertEqual(frames[0], s1.frames)
+        self.assertTrue(np.array_equal(frames[0], s1.samples))
         self.assertEqual(len(frames[0]), len(s1.frames))
-        self.assertEqual(frames[1], s2.frames)
+        self.assertTrue(np.array_equal(frames[1], s2.samples))
         self.assertEqual(len(frames[1]), len(s2.frames))
         self.assertEqual(s.comptype, s1.comptype, s2.comptype)
         self.assertEqual(s.compname, s1.compname, s2.compname)
@@ -155,6 +197,78 @@ class TestAudioEditor(TestCase):
         n2 = int.from_bytes(s.frames[0], byteorder='big', signed=True)
         self.assertAlmostEqual(n1, n2, delta=1000)
 
+    def test_samples(self):
+        s = AudioEditor('обычный.wav')
+        self.assertEqual((s.nframes, s.nchannels), s.samples.shape)
+        self.assertEqual(np.int16, s.samples.dtype)
+        self.assertEqual(s.nframes, len(s.frames))
+        self.assertEqual(s.content, b''.join(s.frames))
+        s.frames = s.frames[:10]
+        self.assertEqual((10, 2), s.samples.shape)
+        self.assertEqual(10, s.nframes)
+
+    def test_change_volume(self):
+        s = AudioEditor('обычный.wav')
+        old_frames = s.frames[:100]
+        s.change_volume(-6)
+        for i in range(len(old_frames)):
+            for old_sample, sample in zip(s.get_separated_frame_in_samples(old_frames[i]),
+                                          s.get_separated_frame_in_samples(s.frames[i])):
+                self.assertAlmostEqual(int(s.sample_to_int(old_sample) * 10 ** (-6 / 20)),
+                                       s.sample_to_int(sample), delta=1)
+        s.change_volume(100)
+        self.assertEqual(s.peak - 1, s.samples.max())
+        self.assertEqual(-s.peak, s.samples.min())
+
+    def test_change_volume_per_channel(self):
+        s = AudioEditor('обычный.wav')
+        old_samples = s.samples.copy()
+        s.change_volume([0, -20])
+        self.assertTrue(np.array_equal(old_samples[:, 0], s.samples[:, 0]))
+        self.assertTrue(np.array_equal(np.trunc(old_samples[:, 1] / 10), s.samples[:, 1]))
+
+    def test_change_volume_by_envelope(self):
+        s = AudioEditor('bowl.wav')
+        old_samples = s.samples.copy()
+        s.fade_in(1000)
+        self.assertEqual(0, s.samples[0, 0])
+        self.assertTrue(np.array_equal(old_samples[s.framerate:], s.samples[s.framerate:]))
+        middle = s.framerate // 2
+        self.assertEqual(int(old_samples[middle, 0] * 0.5), s.samples[middle, 0])
+
+    def test_change_temp_with_workers(self):
+        for file_name, count_of_channels in [('bowl.wav', 0), ('bowl.wav', 1)]:
+            s = AudioEditor(file_name)
+            s.add_channels_into_frames(count_of_channels)
+            serial_channels = s.change_temp_for_each_channel_and_get_samples(0.7, 2 ** 13, 2 ** 11)
+            s.workers = 2
+            parallel_channels = s.change_temp_for_each_channel_and_get_samples(0.7, 2 ** 13, 2 ** 11)
+            self.assertEqual(len(serial_channels), len(parallel_channels))
+            for serial_channel, parallel_channel in zip(serial_channels, parallel_channels):
+                self.assertEqual(len(serial_channel), len(parallel_channel))
+                self.assertTrue(np.allclose(serial_channel, parallel_channel, rtol=0, atol=1e-6))
+
+    def test_change_temp_keeps_tone(self):
+        framerate = 44100
+        tone = 10000 * np.sin(2 * np.pi * 440 * np.arange(2 * framerate) / framerate)
+        vocoder = PhaseVocoder(0.7, 2 ** 13, 2 ** 11)
+        result = np.concatenate((vocoder.process(tone), vocoder.flush()))[2 ** 14:-2 ** 14]
+        rms = np.sqrt(np.mean(result[:len(result) // 1024 * 1024].reshape(-1, 1024) ** 2, axis=1))
+        self.assertLess(rms.std() / rms.mean(), 0.1)
+        spectrum = np.abs(np.fft.rfft(np.hanning(len(result)) * result))
+        self.assertAlmostEqual(440, np.argmax(spectrum) * framerate / len(result), delta=1)
+
+    def test_change_temp_matches_hop_by_hop(self):
+        s = AudioEditor('обычный.wav')
+        content = s.content_to_int_and_get_converted_channels_of_samples()[0].astype(float)
+        content = np.concatenate((np.zeros(2 ** 13), content[:s.framerate]))
+        for factor in [0.7, 1, 1.3]:
+            vocoder = PhaseVocoder(factor, 2 ** 13, 2 ** 11)
+            result = np.concatenate((vocoder.process(content), vocoder.flush()))
+            expected_result = stretch_hop_by_hop(content, factor, 2 ** 13, 2 ** 11)
+            self.assertEqual(len(expected_result), len(result))
+            self.assertTrue(np.allclose(expected_result, result, rtol=0, atol=1e-6 * np.abs(expected_result).max()))
+
     def test_change_speed(self):
         s = AudioEditor('обычный.wav')
         old_nframes = s.nframes
@@ -163,6 +277,756 @@ class TestAudioEditor(TestCase):
         self.assertEqual(round(old_nframes / 2), len(s.frames))
         self.assertEqual([old_frames[i] for i in range(len(old_frames)) if i % 2 == 0], s.frames)
 
+    def test_change_speed_with_quality(self):
+        framerate = 44100
+        sine = 10000 * np.sin(2 * np.pi * 440 * np.arange(framerate) / framerate)
+        for quality, delta in [('nearest', 400), ('linear', 10), ('sinc', 2)]:
+            s = AudioEditor('bowl.wav')
+            s.samples = sine.astype(np.int16)[:, np.newaxis]
+            s.change_speed(1.5, quality)
+            expected_samples = 10000 * np.sin(2 * np.pi * 440 * np.arange(s.nframes) * 1.5 / framerate)
+            self.assertEqual(round(framerate / 1.5), s.nframes)
+            self.assertLess(np.abs(s.samples[200:-200, 0] - expected_samples[200:-200]).max(), delta)
+
+    def test_change_speed_close_to_one(self):
+        s = AudioEditor('bowl.wav')
+        old_samples = s.samples.copy()
+        s.change_speed(1.0000001, 'nearest')
+        self.assertTrue(np.array_equal(old_samples, s.samples))
+
+    def test_change_speed_slow_nearest(self):
+        s = AudioEditor('bowl.wav')
+        old_samples = s.samples.copy()
+        s.change_speed(0.4, 'nearest')
+        self.assertEqual(round(len(old_samples) / 0.4), s.nframes)
+        positions = np.minimum(np.floor(np.arange(s.nframes) * 0.4 + 0.5).astype(int), len(old_samples) - 1)
+        self.assertTrue(np.array_equal(old_samples[positions], s.samples))
+
+
+class TestRegionEditing(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.new_name = os.path.join(self.directory.name, 'changing.wav')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_change_volume_in_region(self):
+        s = AudioEditor('обычный.wav')
+        old_samples = s.samples.copy()
+        s.change_volume(-20, 1000, 2000)
+        self.assertEqual(old_samples.shape, s.samples.shape)
+        self.assertTrue(np.array_equal(old_samples[:44100], s.samples[:44100]))
+        self.assertTrue(np.array_equal(np.trunc(old_samples[44100:88200] / 10), s.samples[44100:88200]))
+        self.assertTrue(np.array_equal(old_samples[88200:], s.samples[88200:]))
+        self.assertTrue(np.array_equal(old_samples, AudioEditor('обычный.wav').samples))
+
+    def test_change_pitch_in_region(self):
+        s = AudioEditor('bowl.wav')
+        old_samples = s.samples.copy()
+        s.change_pitch(3, start_in_milliseconds=500, end_in_milliseconds=700)
+        self.assertEqual(old_samples.shape, s.samples.shape)
+        self.assertTrue(np.array_equal(old_samples[:24000], s.samples[:24000]))
+        self.assertFalse(np.array_equal(old_samples[24000:33600], s.samples[24000:33600]))
+        self.assertTrue(np.array_equal(old_samples[33600:], s.samples[33600:]))
+
+    def test_write_changed_regions(self):
+        s = AudioEditor('обычный.wav')
+        s.change_volume(3)
+        s.write_changes_to_new_file(self.new_name)
+        s.change_volume(-6, 1000, 1500)
+        s.fade_out(300)
+        self.assertEqual([(44100, 66150), (s.nframes - 13230, s.nframes)], s.changed_regions)
+        self.assertTrue(s.can_update(self.new_name))
+        s.write_changes_to_new_file(self.new_name)
+        self.assertTrue(np.array_equal(s.samples, AudioEditor(self.new_name).samples))
+        with open(self.new_name, 'ab') as file:
+            file.write(b'\x00')
+        self.assertFalse(s.can_update(self.new_name))
+
+
+class TestStreamEditor(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.new_name = os.path.join(self.directory.name, 'changing.wav')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assert_stream_equal_to_audio_editor(self, file_name, actions, block_size):
+        s = AudioEditor(file_name)
+        stream_editor = StreamEditor(file_name, block_size)
+        for name, arguments in actions:
+            getattr(s, name)(*arguments)
+            getattr(stream_editor, name)(*arguments)
+        stream_editor.write_changes_to_new_file(self.new_name)
+        result = AudioEditor(self.new_name)
+        self.assertEqual(s.nchannels, result.nchannels)
+        self.assertEqual(s.sampwidth, result.sampwidth)
+        self.assertEqual(s.nframes, result.nframes)
+        self.assertTrue(np.array_equal(s.samples, result.samples))
+
+    def test_volume_and_speed(self):
+        self.assert_stream_equal_to_audio_editor('обычный.wav', [('change_volume', (10,)), ('change_speed', (0.7,)),
+                                                                 ('change_speed', (1.6,))], 10000)
+
+    def test_temp_and_pitch(self):
+        self.assert_stream_equal_to_audio_editor('bowl.wav', [('add_channels_into_frames', (1,)),
+                                                              ('change_temp', (1.3,)), ('change_pitch', (-5,))], 1000)
+
+    def test_extend_samples(self):
+        self.assert_stream_equal_to_audio_editor('bowl.wav', [('change_pitch', (2,)), ('extend_samples', (1,))], 4096)
+
+    def test_speed_with_quality(self):
+        self.assert_stream_equal_to_audio_editor('обычный.wav', [('change_speed', (0.7, 'sinc')),
+                                                                 ('change_speed', (1.6, 'nearest'))], 3000)
+
+
+class TestPitchShifter(TestCase):
+
+    def setUp(self):
+        times = np.arange(3 * 44100) / 44100
+        self.values = np.column_stack((10000 * np.sin(2 * np.pi * 440 * times), np.zeros(len(times))))
+        self.values[(times < 1) | (times >= 2)] = 0
+
+    def test_frequency_and_level(self):
+        for pitch_in_semitone, phase_locking in [(3.5, True), (-5, True), (3.5, False)]:
+            factor = get_pitch_factor(pitch_in_semitone)
+            result = shift_pitch_values(self.values, factor, phase_locking=phase_locking)
+            self.assertEqual(self.values.shape, result.shape)
+            tone = result[55000:77000, 0]
+            spectrum = np.abs(np.fft.rfft(tone * np.hanning(len(tone))))
+            self.assertAlmostEqual(440 * factor, np.argmax(spectrum) * 44100 / len(tone), delta=2)
+            if phase_locking:
+                self.assertAlmostEqual(1, np.sqrt(np.mean(tone ** 2) / np.mean(self.values[55000:77000, 0] ** 2)),
+                                       delta=0.05)
+            self.assertLess(np.abs(result[:, 1]).max(), 1)
+
+    def test_latency_compensation(self):
+        for pitch_in_semitone in [-7.5, 5, 12]:
+            energy = shift_pitch_values(self.values, get_pitch_factor(pitch_in_semitone))[:, 0] ** 2
+            center = np.sum(np.arange(len(energy)) * energy) / np.sum(energy)
+            self.assertAlmostEqual(1.5 * 44100, center, delta=441)
+
+    def test_block_size(self):
+        self.assertTrue(np.array_equal(shift_pitch_values(self.values, 0.8, block_size=1000),
+                                       shift_pitch_values(self.values, 0.8, block_size=30000)))
+
+
+class TestLoudness(TestCase):
+
+    def tearDown(self):
+        disable_cache()
+
+    def test_reference_sine(self):
+        times = np.arange(5 * 48000) / 48000
+        samples = np.round(3276.7 * np.sin(2 * np.pi * 997 * times)).astype(np.int16)[:, np.newaxis]
+        loudness = measure_loudness(samples, 2, 48000)
+        self.assertAlmostEqual(-20, loudness.peak, delta=0.01)
+        self.assertAlmostEqual(-23.01, loudness.rms, delta=0.01)
+        self.assertAlmostEqual(-23.01, loudness.integrated, delta=0.01)
+        self.assertAlmostEqual(-20, measure_loudness(np.column_stack((samples, samples)), 2, 48000).integrated,
+                               delta=0.01)
+
+    def test_block_size(self):
+        samples = AudioEditor('обычный.wav').samples
+        self.assertEqual(measure_loudness(samples, 2, 44100, 5000), measure_loudness(samples, 2, 44100, 2 ** 16))
+
+    def test_gating(self):
+        samples = np.zeros((10 * 44100, 1), dtype=np.int16)
+        self.assertEqual(-np.inf, measure_loudness(samples, 2, 44100).integrated)
+        times = np.arange(2 * 44100) / 44100
+        samples[:len(times), 0] = np.round(3276.7 * np.sin(2 * np.pi * 997 * times))
+        self.assertAlmostEqual(-23.01 + 10 * np.log10((17 + 0.75 + 0.5 + 0.25) / 20),
+                               measure_loudness(samples, 2, 44100).integrated, delta=0.01)
+
+    def test_normalize(self):
+        s = AudioEditor('обычный.wav')
+        s.normalize(-20)
+        self.assertAlmostEqual(-20, s.get_loudness().integrated, delta=0.1)
+        s.normalize(target_peak=-6)
+        self.assertAlmostEqual(-6, s.get_loudness().peak, delta=0.01)
+        s.normalize(-10, -6)
+        self.assertAlmostEqual(-6, s.get_loudness().peak, delta=0.01)
+        self.assertRaises(ValueError, s.normalize)
+        render_graph = RenderGraph(AudioEditor('обычный.wav'))
+        render_graph.change_volume(-10)
+        render_graph.normalize(-20)
+        render_graph.render()
+        self.assertAlmostEqual(-20, render_graph.audio_editor.get_loudness().integrated, delta=0.1)
+
+    def test_cache_loudness(self):
+        sample_cache = enable_cache()
+        loudness = AudioEditor('bowl.wav').get_loudness()
+        count_of_hits = sample_cache.count_of_hits
+        self.assertEqual(loudness, AudioEditor('bowl.wav').get_loudness())
+        self.assertEqual(count_of_hits + 3, sample_cache.count_of_hits)
+
+
+class TestSilence(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.directory.name, 'pauses.wav')
+        tone = np.round(8000 * np.sin(2 * np.pi * 440 * np.arange(44100) / 44100))
+        self.samples = np.zeros((10 * 44100, 2), dtype=np.int16)
+        for start in [0.5, 3, 6.2]:
+            self.samples[int(start * 44100):int(start * 44100) + 44100] = tone[:, np.newaxis]
+        new_file = WavWriter(self.file_name, 2, 2, 44100, len(self.samples))
+        new_file.write(0, self.samples)
+        new_file.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_detect_silence(self):
+        regions = [(0, 22050), (66150, 132300), (176400, 273420), (317520, 441000)]
+        for block_size in [1000, 4410, 2 ** 16]:
+            self.assertEqual(regions, detect_silence(get_blocks(self.samples, block_size), 2, 44100))
+        self.assertEqual([99225, 224910], get_cut_points(regions, len(self.samples)))
+        self.assertEqual([(317520, 441000)], detect_silence(get_blocks(self.samples), 2, 44100, envelope='peak',
+                                                            min_silence_in_milliseconds=2500))
+        self.assertEqual([(0, 441000)], detect_silence(get_blocks(self.samples), 2, 44100, threshold_in_dB=0))
+
+    def test_split_on_silence(self):
+        self.assertEqual([2250, 5100], AudioEditor(self.file_name).split_on_silence())
+        file_names = [os.path.join(self.directory.name, 'splitting_{}_pauses.wav'.format(i)) for i in range(1, 4)]
+        parts = [AudioEditor(file_name).samples for file_name in file_names]
+        self.assertEqual([99225, 224910 - 99225, 441000 - 224910], [len(part) for part in parts])
+        self.assertTrue(np.array_equal(self.samples, np.concatenate(parts)))
+        for file_name in file_names:
+            os.remove(file_name)
+        self.assertEqual([2250, 5100], Timeline(self.file_name).split_on_silence())
+        for file_name, part in zip(file_names, parts):
+            self.assertTrue(np.array_equal(part, AudioEditor(file_name).samples))
+
+
+class TestMixer(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.mono_name = os.path.join(self.directory.name, 'mono.wav')
+        self.mono_samples = np.random.RandomState(0).randint(64, 192, (50000, 1)).astype(np.uint8)
+        new_file = WavWriter(self.mono_name, 1, 1, 44100, len(self.mono_samples))
+        new_file.write(0, self.mono_samples)
+        new_file.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_mix(self):
+        s = AudioEditor('обычный.wav')
+        speech = s.samples.astype(float)
+        s.mix([MixTrack(self.mono_name, -6, 10000, [[1, 0]]), MixTrack('обр.wav', 3)], None, 10000)
+        self.assertEqual((661500, 2, 2), (s.nframes, s.nchannels, s.sampwidth))
+        music = AudioEditor('обр.wav').samples * 10 ** (3 / 20)
+        mono = (self.mono_samples[:, 0].astype(float) - 128) * 256 * 10 ** (-6 / 20)
+        expected = music
+        expected[:len(speech)] += speech
+        expected[441000:491000, 0] += mono
+        self.assertLessEqual(np.abs(np.clip(expected, -32768, 32767) - s.samples).max(), 1)
+
+    def test_limit(self):
+        s = AudioEditor('обычный.wav')
+        old_samples = s.samples.copy()
+        s.mix([MixTrack('обычный.wav'), MixTrack('обычный.wav', -3)])
+        self.assertEqual(old_samples.shape, s.samples.shape)
+        quiet = np.abs(old_samples.astype(int)).max(axis=1) < 10000
+        expected = np.round(old_samples[quiet] * (2 + 10 ** (-3 / 20)))
+        self.assertLessEqual(np.abs(expected - s.samples[quiet]).max(), 1)
+        loud = np.abs(old_samples.astype(int)) * (2 + 10 ** (-3 / 20)) > 32768
+        self.assertTrue(np.all(np.abs(s.samples[loud].astype(int)) >= 32768 * 10 ** (-1 / 20) - 1))
+        self.assertTrue(np.all(np.sign(s.samples[loud]) == np.sign(old_samples[loud])))
+
+    def test_mix_files(self):
+        new_name = os.path.join(self.directory.name, 'mix.wav')
+        tracks = [MixTrack('обычный.wav', -3, 500), MixTrack(self.mono_name, 0, 0, [[1, 0.5]])]
+        mixer = mix_files([MixTrack(self.mono_name)] + tracks, new_name, block_size=3000)
+        s = AudioEditor(self.mono_name)
+        s.mix(tracks)
+        self.assertEqual((2, 2, 44100, 22050 + 441667), (mixer.nchannels, mixer.sampwidth, mixer.framerate,
+                                                         mixer.nframes))
+        self.assertTrue(np.array_equal(AudioEditor(new_name).samples, s.samples))
+        self.assertRaises(ValueError, s.mix, [MixTrack('bowl.wav')])
+
+
+class TestRenderGraph(TestCase):
+
+    def render_like_editor(self, commands):
+        s = AudioEditor('bowl.wav')
+        render_graph = RenderGraph(AudioEditor('bowl.wav'))
+        for audio in [s, render_graph]:
+            for command, args in commands:
+                getattr(audio, command)(*args)
+        render_graph.render()
+        self.assertEqual(s.nframes, render_graph.audio_editor.nframes)
+        return s.samples.astype(int), render_graph.audio_editor.samples
+
+    def assert_renders_like_editor(self, commands, delta):
+        expected_samples, samples = self.render_like_editor(commands)
+        self.assertLessEqual(np.abs(expected_samples - samples).max(), delta)
+
+    def test_fuse(self):
+        self.assertEqual([Gain(4), Speed(2, 'linear'), Temp(0.5, 2 ** 13, 2 ** 11), Gain(2), Speed(1.25, 'sinc'),
+                          Gain(0.25)],
+                         fuse([Gain(2), Gain(2), Speed(2, 'linear'), Temp(0.5, 2 ** 13, 2 ** 11), Gain(2),
+                               Speed(1.25, 'sinc'), Gain(0.5), Gain(0.5)]))
+        self.assertEqual([Speed(0.5, 'linear'), Temp(1.5, 2 ** 13, 2 ** 11)],
+                         fuse([Speed(0.5, 'linear'), Speed(1, 'linear'), Gain(0.5), Temp(1.5, 2 ** 13, 2 ** 11),
+                               Gain(1)]))
+        self.assertEqual([Gain(10), Temp(1.5, 2 ** 13, 2 ** 11), Temp(1.5, 2 ** 13, 2 ** 11)],
+                         fuse([Gain(10), Gain(0.1), Temp(1.5, 2 ** 13, 2 ** 11), Temp(1.5, 2 ** 13, 2 ** 11)]))
+        self.assertEqual([Pitch(0.5, 2 ** 14, 2 ** 12, 'sinc', 2.5)],
+                         fuse([Speed(2, 'linear'), Pitch(0.5, 2 ** 13, 2 ** 11, 'linear'), Speed(1.25, 'sinc')]))
+        self.assertEqual([Speed(1.3, 'linear'), Pitch(0.5, 2 ** 13, 2 ** 11, 'linear')],
+                         fuse([Speed(1.3, 'linear'), Pitch(0.5, 2 ** 13, 2 ** 11, 'linear')]))
+
+    def test_fused_gains_render_like_editor(self):
+        self.assert_renders_like_editor([('change_volume', (10,)), ('change_volume', (6,))], 2)
+        self.assert_renders_like_editor([('change_volume', (-10,)), ('change_volume', (-6,))], 2)
+        self.assert_renders_like_editor([('change_volume', (20,)), ('change_volume', (-20,))], 2)
+
+    def test_gain_before_temp_renders_like_editor(self):
+        self.assert_renders_like_editor([('change_volume', (-6,)), ('change_temp', (1.3,))], 8)
+
+    def test_fused_speeds_render_like_editor(self):
+        self.assert_renders_like_editor([('change_speed', (2, 'sinc')), ('change_speed', (0.8, 'sinc'))], 24)
+        expected_samples, samples = self.render_like_editor([('change_speed', (2,)), ('change_speed', (0.8,))])
+        self.assertLess(np.linalg.norm(expected_samples - samples), 0.02 * np.linalg.norm(expected_samples))
+
+    def test_unfused_operations_render_like_editor(self):
+        self.assert_renders_like_editor([('change_speed', (0.7,)), ('change_temp', (1.3,))], 0)
+        self.assert_renders_like_editor([('change_temp', (0.8,)), ('change_speed', (1.5,))], 0)
+        self.assert_renders_like_editor([('change_volume', (20,)), ('change_speed', (1.3,)),
+                                         ('change_pitch', (-3,)), ('change_volume', (-10,))], 0)
+        self.assert_renders_like_editor([('change_volume', (-3.5,)), ('change_speed', (1.3,)),
+                                         ('change_volume', (2.5,))], 0)
+
+    def test_speed_and_pitch_render_like_editor(self):
+        for commands in [[('change_speed', (2, 'sinc')), ('change_pitch', (-10, 2 ** 13, 2 ** 11, 'sinc'))],
+                         [('change_pitch', (-10, 2 ** 13, 2 ** 11, 'sinc')), ('change_speed', (1.3, 'sinc'))]]:
+            expected_samples, samples = self.render_like_editor(commands)
+            self.assertLess(np.linalg.norm(expected_samples - samples), 0.03 * np.linalg.norm(expected_samples))
+
+    def test_render(self):
+        render_graph = RenderGraph(AudioEditor('bowl.wav'))
+        render_graph.change_speed(2)
+        render_graph.change_pitch(-10)
+        render_graph.change_volume(3)
+        self.assertEqual([Pitch(get_pitch_factor(-10), 2 ** 14, 2 ** 12, 'linear', 2), Gain(db_to_gain(3))],
+                         fuse(render_graph.operations))
+        expected_samples, samples = self.render_like_editor([('change_speed', (2,)), ('change_pitch', (-10,)),
+                                                             ('change_volume', (3,))])
+        self.assertLess(np.linalg.norm(expected_samples - samples), 0.03 * np.linalg.norm(expected_samples))
+
+
+def process_file_or_exit(file_name, operations, new_name, quality='linear'):
+    if file_name == 'crash.wav':
+        os._exit(1)
+    return process_file(file_name, operations, new_name, quality)
+
+
+class TestBatch(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_jobs(self):
+        manifest = os.path.join(self.directory.name, 'manifest.jsonl')
+        with open(manifest, 'w', encoding='utf-8') as file:
+            file.write('{"file": "bowl.wav", "speed": 2, "output": "fast.wav"}\n{"file": "missing.wav"}\n')
+        jobs = get_jobs(['bowl.wav'], manifest, [('volume', -3.0)], self.directory.name)
+        self.assertEqual([('bowl.wav', [('volume', -3.0)], os.path.join(self.directory.name, 'bowl.wav')),
+                          ('bowl.wav', [('speed', 2.0)], os.path.join(self.directory.name, 'fast.wav')),
+                          ('missing.wav', [], os.path.join(self.directory.name, 'missing.wav'))], jobs)
+        results = run_jobs(jobs, count_of_processes=2, memory_limit=0)
+        self.assertEqual([None, None], [result['error'] for result in results[:2]])
+        self.assertIsNotNone(results[2]['error'])
+        s = AudioEditor('bowl.wav')
+        s.change_speed(2)
+        self.assertTrue(np.array_equal(s.samples, AudioEditor(jobs[1][2]).samples))
+
+    def test_same_file_names_in_different_directories(self):
+        os.mkdir(os.path.join(self.directory.name, 'other'))
+        other_name = shutil.copy('bowl.wav', os.path.join(self.directory.name, 'other'))
+        with self.assertRaises(ValueError):
+            get_jobs(['bowl.wav', other_name], None, [], self.directory.name)
+
+    def test_broken_process_pool(self):
+        jobs = [(file_name, [('volume', -3.0)], os.path.join(self.directory.name, new_name))
+                for file_name, new_name in [('bowl.wav', 'first.wav'), ('crash.wav', 'crash.wav'),
+                                            ('bowl.wav', 'second.wav')]]
+        with mock.patch('batch.process_file', process_file_or_exit):
+            results = run_jobs(jobs, count_of_processes=1, memory_limit=0)
+        self.assertEqual([None, None], [results[0]['error'], results[2]['error']])
+        self.assertTrue(results[1]['error'].startswith('BrokenProcessPool'))
+        self.assertTrue(np.array_equal(AudioEditor(jobs[0][2]).samples, AudioEditor(jobs[2][2]).samples))
+
+
+class TestTimeline(TestCase):
+
+    def test_join_and_change_volume(self):
+        s = AudioEditor('bowl.wav')
+        timeline = Timeline('bowl.wav', 10000)
+        for audio in [s, timeline]:
+            audio.change_volume(-3)
+            audio.join('обр.wav')
+            audio.change_volume(2)
+            audio.join('bowl.wav')
+        self.assertEqual((s.nchannels, s.sampwidth, s.nframes),
+                         (timeline.nchannels, timeline.sampwidth, timeline.nframes))
+        self.assertEqual(3, len(timeline.segments))
+        self.assertTrue(np.array_equal(s.samples, timeline.get_samples()))
+
+    def test_split_and_trim(self):
+        s = AudioEditor('обычный.wav')
+        timeline = Timeline('обычный.wav')
+        timeline.join('bowl.wav')
+        s.join('bowl.wav')
+        parts = timeline.split([1000, 9500.3])
+        for samples, part in zip(s.split_and_get_frames([1000, 9500.3]), parts):
+            self.assertTrue(np.array_equal(samples, part.get_samples()))
+        self.assertEqual(2, len(parts[2].segments))
+        timeline.trim(500, 12000)
+        self.assertTrue(np.array_equal(s.samples[22050:529200], timeline.get_samples()))
+
+
+class TestSampleCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        disable_cache()
+        self.directory.cleanup()
+
+    def test_read_from_cache(self):
+        sample_cache = enable_cache(directory=self.directory.name)
+        s1 = AudioEditor('bowl.wav')
+        s2 = AudioEditor('bowl.wav')
+        self.assertEqual((2, 2), (sample_cache.count_of_misses, sample_cache.count_of_hits))
+        self.assertTrue(np.array_equal(s1.samples, s2.samples))
+        self.assertFalse(s2.samples.flags.writeable)
+        sample_cache = enable_cache(directory=self.directory.name)
+        s3 = AudioEditor('bowl.wav')
+        self.assertEqual((0, 2), (sample_cache.count_of_misses, sample_cache.count_of_hits))
+        self.assertEqual((s1.nchannels, s1.sampwidth, s1.framerate, s1.nframes),
+                         (s3.nchannels, s3.sampwidth, s3.framerate, s3.nframes))
+        self.assertTrue(np.array_equal(s1.samples, s3.samples))
+
+    def test_cache_temp_changing(self):
+        sample_cache = enable_cache()
+        s = AudioEditor('bowl.wav')
+        s.change_temp(1.3)
+        count_of_hits = sample_cache.count_of_hits
+        cached_s = AudioEditor('bowl.wav')
+        cached_s.change_temp(1.3)
+        self.assertEqual(count_of_hits + 3, sample_cache.count_of_hits)
+        self.assertTrue(np.array_equal(s.samples, cached_s.samples))
+        cached_s.change_temp(1.3)
+        self.assertEqual(count_of_hits + 3, sample_cache.count_of_hits)
+
+    def test_memory_budget(self):
+        sample_cache = enable_cache(memory_budget=100000)
+        AudioEditor('bowl.wav')
+        self.assertEqual(1, len(sample_cache.entries))
+        self.assertLessEqual(sample_cache.size, 100000)
+
+    def test_memory_mapped_entries(self):
+        enable_cache(directory=self.directory.name)
+        s1 = AudioEditor('bowl.wav')
+        sample_cache = enable_cache(memory_budget=1000, directory=self.directory.name)
+        sample_cache.put('key', 'resident', np.zeros(100))
+        s2 = AudioEditor('bowl.wav')
+        self.assertIsInstance(s2.samples, np.memmap)
+        self.assertEqual(3, len(sample_cache.entries))
+        self.assertEqual(800, sample_cache.size)
+        self.assertEqual((s1.nchannels, s1.sampwidth, s1.framerate, s1.nframes, s1.comptype, s1.compname),
+                         (s2.nchannels, s2.sampwidth, s2.framerate, s2.nframes, s2.comptype, s2.compname))
+
+
+class TestSampleFormat(TestCase):
+
+    def test_get_converted_samples(self):
+        samples = np.array([[0, 255], [128, 129]], dtype=np.uint8)
+        self.assertEqual([[-32768, 32512], [0, 256]], get_converted_samples(samples, 1, 2, 2).tolist())
+        self.assertEqual([[-2 ** 31, 127 * 2 ** 24], [0, 2 ** 24]], get_converted_samples(samples, 1, 2, 4).tolist())
+        self.assertEqual([[-32768, -32768, -32768]], get_converted_samples(samples[:1, :1], 1, 3, 2).tolist())
+        self.assertEqual([[32], [228]], get_converted_samples(np.array([[0, 64], [200, 255]], dtype=np.uint8), 1, 1,
+                                                              1).tolist())
+        samples = np.array([[-32768, 32767], [1000, 3000]], dtype=np.int16)
+        self.assertEqual([[-32768 * 256, 32767 * 256], [256000, 768000]], get_converted_samples(samples, 2, 2, 3).tolist())
+        self.assertEqual([[0], [2000]], get_converted_samples(samples, 2, 1, 2).tolist())
+
+    def test_float32(self):
+        samples = np.array([[-32768, 0, 32767]], dtype=np.int16)
+        values = samples_to_float32(samples, 2)
+        self.assertEqual(np.float32, values.dtype)
+        self.assertEqual(-1, values[0, 0])
+        self.assertTrue(np.array_equal(samples, float32_to_samples(values, 2)))
+        self.assertTrue(np.array_equal(np.array([[0, 128, 255]], dtype=np.uint8),
+                                       float32_to_samples(values, 1)))
+
+
+class TestWavFile(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.new_name = os.path.join(self.directory.name, 'new.wav')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_reader(self):
+        reader = WavReader('обычный.wav')
+        wav = wave.open('обычный.wav', mode='rb')
+        self.assertEqual((wav.getnchannels(), wav.getsampwidth(), wav.getframerate(), wav.getnframes()),
+                         (reader.nchannels, reader.sampwidth, reader.framerate, reader.nframes))
+        wav.setpos(1000)
+        self.assertEqual(wav.readframes(500), reader.get_raw(1000, 1500).tobytes())
+        wav.close()
+        samples = reader.get_samples(1000, 1500)
+        self.assertEqual((500, 2), samples.shape)
+        self.assertFalse(samples.flags.writeable)
+
+    def test_writer(self):
+        samples = np.array([[-2 ** 23, 2 ** 23 - 1], [1, -1], [-300, 300]])
+        writer = WavWriter(self.new_name, 2, 3, 8000, 5)
+        writer.write(0, samples)
+        writer.close()
+        wav = wave.open(self.new_name, mode='rb')
+        self.assertEqual((2, 3, 8000, 3), (wav.getnchannels(), wav.getsampwidth(), wav.getframerate(),
+                                           wav.getnframes()))
+        wav.close()
+        self.assertTrue(np.array_equal(samples, WavReader(self.new_name).get_samples()))
+
+        writer = WavWriter(self.new_name, 1, 1, 8000, 3)
+        writer.samples[:] = [[0], [128], [255]]
+        writer.close()
+        self.assertEqual(44 + 4, os.path.getsize(self.new_name))
+        self.assertTrue(np.array_equal([[0], [128], [255]], WavReader(self.new_name).get_samples()))
+
+
+class SlowSource:
+    def __init__(self, nframes):
+        self.nchannels = 1
+        self.sampwidth = 2
+        self.framerate = 8000
+        self.nframes = nframes
+
+    def get_blocks(self, block_size, position=0):
+        for start in range(position, self.nframes, block_size):
+            time.sleep(0.05)
+            yield np.ones((min(block_size, self.nframes - start), 1), dtype='<i2')
+
+
+class SlowClosingSource(SlowSource):
+    def get_blocks(self, block_size, position=0):
+        try:
+            yield from super().get_blocks(block_size, position)
+        finally:
+            time.sleep(0.05)
+
+
+class TestPlaybackEngine(TestCase):
+
+    def play(self, source):
+        engine = PlaybackEngine(source, buffer_frames=2 ** 14)
+        engine.start()
+        data = b''
+        while not engine.is_finished():
+            if engine.ring_buffer.get_count_of_available() < 1024 * engine.frame_size and not engine.end_of_source:
+                engine.data_available.wait(0.1)
+                continue
+            data += engine.read(1024)
+        engine.stop()
+        return data
+
+    def test_ring_buffer(self):
+        ring_buffer = RingBuffer(5)
+        self.assertEqual(3, ring_buffer.write(b'abc'))
+        self.assertEqual(b'ab', ring_buffer.read(2))
+        self.assertEqual(4, ring_buffer.write(b'defgh'))
+        self.assertEqual(0, ring_buffer.get_count_of_free())
+        self.assertEqual(b'cdefg', ring_buffer.read(10))
+        self.assertEqual(0, ring_buffer.get_count_of_available())
+
+    def test_read_whole_file(self):
+        engine = PlaybackEngine(FileSource('обычный.wav'), buffer_frames=1000, block_frames=300)
+        engine.start()
+        data = b''
+        while not engine.is_finished():
+            if engine.ring_buffer.get_count_of_available() < 256 * engine.frame_size and not engine.end_of_source:
+                engine.data_available.wait(0.1)
+                continue
+            data += engine.read(256)
+        engine.stop()
+        wav = wave.open('обычный.wav', mode='rb')
+        expected = wav.readframes(wav.getnframes())
+        wav.close()
+        self.assertEqual(expected, data)
+        self.assertEqual(0, engine.count_of_underruns)
+        self.assertTrue(engine.finished.wait(0))
+
+    def test_underrun(self):
+        engine = PlaybackEngine(SlowSource(1000), buffer_frames=1000, block_frames=100)
+        engine.start(prefill_frames=100)
+        first = engine.read(100)
+        second = engine.read(100)
+        engine.stop()
+        self.assertEqual(b'\x01\x00' * 100, first)
+        self.assertEqual(1, engine.count_of_underruns)
+        self.assertEqual(100, engine.count_of_silent_frames)
+        self.assertEqual(b'\x00\x00' * 100, second)
+
+    def test_seek(self):
+        audio_editor = AudioEditor('bowl.wav')
+        frame_size = audio_editor.nchannels * audio_editor.sampwidth
+        for source in (FileSource('bowl.wav'), get_source(audio_editor)):
+            engine = PlaybackEngine(source, buffer_frames=2 ** 12, block_frames=1000)
+            engine.start()
+            engine.read(300)
+            engine.seek(40000)
+            self.assertEqual(40000, engine.position)
+            self.assertGreaterEqual(engine.ring_buffer.get_count_of_available(), engine.frames_per_buffer * frame_size)
+            data = engine.read(100)
+            engine.stop()
+            self.assertEqual(audio_editor.content[40000 * frame_size:40100 * frame_size], data)
+            self.assertEqual(40100, engine.position)
+
+    def test_seek_while_reading(self):
+        engine = PlaybackEngine(SlowClosingSource(10 ** 5), buffer_frames=1000, latency=0.005, block_frames=100)
+        engine.start()
+        reading = threading.Event()
+        reading.set()
+        finished_positions = []
+
+        def consume():
+            while reading.is_set():
+                engine.read(10)
+                if engine.is_finished():
+                    finished_positions.append(engine.position)
+                time.sleep(0.002)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for position in range(1000, 11000, 1000):
+            engine.seek(position)
+            self.assertFalse(engine.is_finished())
+        reading.clear()
+        consumer.join()
+        engine.stop()
+        self.assertEqual([], finished_positions)
+        self.assertGreaterEqual(engine.position, 10000)
+
+    def test_play_from_memory(self):
+        audio_editor = AudioEditor('bowl.wav')
+        audio_editor.change_volume(-6)
+        source = get_source(audio_editor)
+        self.assertEqual((audio_editor.nchannels, audio_editor.sampwidth, audio_editor.nframes),
+                         (source.nchannels, source.sampwidth, source.nframes))
+        self.assertEqual(audio_editor.content, self.play(source))
+
+    def test_play_stream_chain(self):
+        with tempfile.TemporaryDirectory() as directory:
+            new_name = os.path.join(directory, 'new.wav')
+            stream_editor = StreamEditor('bowl.wav', 5000)
+            stream_editor.change_speed(1.3)
+            stream_editor.change_volume(3)
+            stream_editor.write_changes_to_new_file(new_name)
+            wav = wave.open(new_name, mode='rb')
+            expected = wav.readframes(wav.getnframes())
+            wav.close()
+        self.assertEqual(expected, self.play(get_source(stream_editor)))
+
+
+class TestPeakIndex(TestCase):
+    def test_columns(self):
+        samples = np.random.RandomState(1).randint(-2 ** 15, 2 ** 15, (70000, 2)).astype('<i2')
+        values = samples_to_float32(samples, 2)
+        peak_index = PeakIndex.from_source(ArraySource(samples, 2, 44100))
+        self.assertEqual([256, 4096, 65536], [level.samples_per_bin for level in peak_index.levels])
+        self.assertEqual([274, 18, 2], [len(level.minimums) for level in peak_index.levels])
+        minimums, maximums, rms = peak_index.get_columns(0, 4096 * 16, 16)
+        parts = values[:4096 * 16].reshape(16, 4096, 2)
+        self.assertTrue(np.allclose(parts.min(axis=1), minimums, atol=1e-4))
+        self.assertTrue(np.allclose(parts.max(axis=1), maximums, atol=1e-4))
+        self.assertTrue(np.allclose(np.sqrt(np.square(parts).mean(axis=1)), rms, atol=1e-4))
+        minimums, maximums, rms = peak_index.get_columns(69000, 70000, 100)
+        self.assertTrue(np.allclose(values[256 * 273:].max(axis=0), maximums[-1], atol=1e-4))
+
+    def test_sidecar(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'bowl.wav')
+            with open('bowl.wav', 'rb') as source, open(file_name, 'wb') as destination:
+                destination.write(source.read())
+            peak_index = get_peak_index(FileSource(file_name))
+            self.assertTrue(os.path.exists(get_sidecar_name(file_name)))
+            loaded = get_peak_index(FileSource(file_name))
+            self.assertEqual(peak_index.nframes, loaded.nframes)
+            for level, loaded_level in zip(peak_index.levels, loaded.levels):
+                self.assertTrue(np.array_equal(level.rms, loaded_level.rms))
+            os.utime(file_name, ns=(1, 1))
+            self.assertIsNone(PeakIndex.read(get_sidecar_name(file_name), get_file_key(file_name)))
+
+
+class TestProfiling(TestCase):
+    def tearDown(self):
+        disable_profiling()
+
+    def test_report(self):
+        profiler = enable_profiling()
+        audio_editor = AudioEditor('bowl.wav')
+        audio_editor.change_volume(3)
+        audio_editor.change_speed(1.5)
+        with tempfile.TemporaryDirectory() as directory:
+            report_name = os.path.join(directory, 'profile.json')
+            audio_editor.write_changes_to_new_file(os.path.join(directory, 'new.wav'))
+            profiler.write_report(report_name)
+            with open(report_name, encoding='utf-8') as report_file:
+                report = json.load(report_file)
+        operations = report['operations']
+        self.assertEqual(['AudioEditor.set_parameters', 'apply_gain', 'AudioEditor.change_volume', 'resample_values',
+                          'AudioEditor.change_speed', 'AudioEditor.write_samples_to_new_file',
+                          'AudioEditor.write_changes_to_new_file'], list(operations))
+        self.assertEqual(63492, operations['AudioEditor.change_volume']['samples'])
+        self.assertEqual(1, operations['AudioEditor.change_speed']['calls'])
+        self.assertGreaterEqual(operations['AudioEditor.change_speed']['peak_memory'],
+                                operations['resample_values']['peak_memory'])
+        self.assertGreater(operations['resample_values']['samples_per_second'], 0)
+
+    def test_disabled(self):
+        profiler = enable_profiling()
+        disable_profiling()
+        AudioEditor('bowl.wav').change_volume(3)
+        self.assertEqual({}, profiler.records)
+
+
+class TestBenchmarkSuite(TestCase):
+    def test_generated_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'synthetic.wav')
+            generate_wav(file_name, 6, 3, 8000, 0.5, block_size=1000)
+            audio_editor = AudioEditor(file_name)
+            self.assertEqual((6, 3, 8000, 4000), (audio_editor.nchannels, audio_editor.sampwidth,
+                                                  audio_editor.framerate, audio_editor.nframes))
+            self.assertLess(abs(audio_editor.samples).max(), 2 ** 23)
+            seconds, count_of_samples = run_operation('split', file_name, directory)
+            self.assertEqual(6 * 4000, count_of_samples)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'splitting_3_synthetic.wav')))
+
+    def test_regressions(self):
+        baseline = [{'nchannels': 2, 'sampwidth': 2, 'duration': 10, 'operation': operation, 'seconds': 1.0}
+                    for operation in ['load', 'join']]
+        results = [dict(baseline[0], seconds=1.1), dict(baseline[1], seconds=1.5),
+                   dict(baseline[1], duration=60, seconds=9.0)]
+        self.assertEqual([(results[1], baseline[1])], get_regressions(results, baseline, 0.2))
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,168 @@
+import copy
+
+import numpy as np
+
+from sampleformat import sample_types, milliseconds_to_frames
+from stream import StreamFormat, VolumeProcessor, ChannelsProcessor, SampleWidthProcessor
+from wavfile import WavReader, WavWriter, get_new_file_name, get_split_file_names
+from silence import detect_silence, get_cut_points
+from profiling import profiled
+
+
+class Segment:
+    def __init__(self, file_name, start, end, input_format, processors):
+        self.file_name = file_name
+        self.start = start
+        self.end = end
+        self.input_format = input_format
+        self.processors = processors
+
+    @property
+    def nframes(self):
+        return self.end - self.start
+
+    def get_part(self, start, end):
+        return Segment(self.file_name, self.start + start, self.start + end, self.input_format, self.processors)
+
+    def get_blocks(self, block_size):
+        stream_format = self.input_format
+        for processor in self.processors:
+            stream_format = processor.start(stream_format)
+        wav = WavReader(self.file_name)
+        for start in range(self.start, self.end, block_size):
+            block = wav.get_samples(start, min(start + block_size, self.end))
+            for processor in self.processors:
+                block = processor.process(block)
+            yield block
+        wav.close()
+
+
+class Timeline:
+    def __init__(self, file_name, block_size=2 ** 16):
+        self.file_name = file_name
+        self.block_size = block_size
+        self.segments = [self.get_segment(file_name)]
+        self.format = self.segments[0].input_format
+
+    @property
+    def nchannels(self):
+        return self.format.nchannels
+
+    @property
+    def sampwidth(self):
+        return self.format.sampwidth
+
+    @property
+    def framerate(self):
+        return self.format.framerate
+
+    @property
+    def nframes(self):
+        return sum(segment.nframes for segment in self.segments)
+
+    def get_segment(self, file_name):
+        wav = WavReader(file_name)
+        input_format = StreamFormat(wav.nchannels, wav.sampwidth, wav.framerate, wav.nframes)
+        wav.close()
+        return Segment(file_name, 0, input_format.nframes, input_format, [])
+
+    def add_processor(self, processor):
+        for segment in self.segments:
+            segment.processors = segment.processors + [processor]
+        self.format = processor.get_output_format(self.format)
+
+    def add_channels_into_frames(self, count_of_channels):
+        self.add_processor(ChannelsProcessor(count_of_channels))
+
+    def extend_samples(self, sampwidth):
+        self.add_processor(SampleWidthProcessor(sampwidth))
+
+    def change_volume(self, volume_in_dB):
+        if np.all(np.asarray(volume_in_dB) == 0):
+            return
+        self.add_processor(VolumeProcessor(volume_in_dB))
+
+    def add_channels_and_extend_samples(self, other_format):
+        if self.nchannels < other_format.nchannels:
+            self.add_channels_into_frames(other_format.nchannels - self.nchannels)
+        if self.sampwidth < other_format.sampwidth:
+            self.extend_samples(other_format.sampwidth - self.sampwidth)
+
+    def join(self, other_audio):
+        segment = self.get_segment(other_audio)
+        self.add_channels_and_extend_samples(segment.input_format)
+        if segment.input_format.nchannels < self.nchannels:
+            segment.processors.append(ChannelsProcessor(self.nchannels - segment.input_format.nchannels))
+        if segment.input_format.sampwidth < self.sampwidth:
+            segment.processors.append(SampleWidthProcessor(self.sampwidth - segment.input_format.sampwidth))
+        self.segments.append(segment)
+
+    def get_frame_position(self, position_in_milliseconds):
+        return min(max(milliseconds_to_frames(position_in_milliseconds, self.framerate), 0), self.nframes)
+
+    def get_segments(self, start, end):
+        segments = []
+        segment_start = 0
+        for segment in self.segments:
+            segment_end = segment_start + segment.nframes
+            if segment_start < end and start < segment_end:
+                segments.append(segment.get_part(max(start - segment_start, 0), min(end, segment_end) - segment_start))
+            segment_start = segment_end
+        return segments
+
+    def get_part(self, start, end):
+        part = copy.copy(self)
+        part.segments = self.get_segments(start, end)
+        return part
+
+    def trim(self, start_in_milliseconds, end_in_milliseconds=None):
+        end = self.nframes if end_in_milliseconds is None else self.get_frame_position(end_in_milliseconds)
+        self.segments = self.get_segments(self.get_frame_position(start_in_milliseconds), end)
+
+    def split(self, positions_in_milliseconds):
+        positions = {self.get_frame_position(position) for position in np.atleast_1d(positions_in_milliseconds)}
+        bounds = [0] + sorted(positions - {0, self.nframes}) + [self.nframes]
+        return [self.get_part(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    @profiled
+    def split_and_write_result_in_new_files(self, positions_in_milliseconds):
+        parts = self.split(positions_in_milliseconds)
+        if len(parts) == 1:
+            return
+        file_names = get_split_file_names(self.file_name, len(parts))
+        for i in range(len(parts)):
+            parts[i].write_changes_to_new_file(file_names[i])
+
+    def get_silent_regions(self, threshold_in_dB=-40, min_silence_in_milliseconds=500, envelope='rms'):
+        return detect_silence(self.get_blocks(), self.sampwidth, self.framerate, threshold_in_dB,
+                              min_silence_in_milliseconds, envelope=envelope)
+
+    def split_on_silence(self, threshold_in_dB=-40, min_silence_in_milliseconds=500, envelope='rms'):
+        regions = self.get_silent_regions(threshold_in_dB, min_silence_in_milliseconds, envelope)
+        positions = [position * 1000 / self.framerate for position in get_cut_points(regions, self.nframes)]
+        self.split_and_write_result_in_new_files(positions)
+        return positions
+
+    def get_blocks(self):
+        for segment in self.segments:
+            for block in segment.get_blocks(self.block_size):
+                yield block
+
+    def get_samples(self):
+        samples = np.empty((self.nframes, self.nchannels), dtype=sample_types[self.sampwidth])
+        position = 0
+        for block in self.get_blocks():
+            samples[position:position + len(block)] = block
+            position += len(block)
+        return samples
+
+    @profiled
+    def write_changes_to_new_file(self, new_name=None):
+        if new_name is None:
+            new_name = get_new_file_name(self.file_name, 'changing_')
+        new_file = WavWriter(new_name, self.nchannels, self.sampwidth, self.framerate, self.nframes)
+        position = 0
+        for block in self.get_blocks():
+            new_file.write(position, block)
+            position += len(block)
+        new_file.close()
@@ -0,0 +1,126 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def get_normalized(result, maximum):
+    return (2 ** (16 - 4)) * result / maximum
+
+
+def get_count_of_hops(length, window_size, h, factor):
+    return len(np.arange(0, length - (window_size + h), h * factor))
+
+
+def get_unit_phasors(spectra):
+    magnitudes = np.abs(spectra)
+    return np.divide(spectra, magnitudes, out=np.ones_like(spectra), where=magnitudes != 0), magnitudes
+
+
+def stretch_hop_by_hop(content, factor, window_size, h):
+    phase = np.zeros(window_size)
+    hanning_window = np.hanning(window_size)
+    result = np.zeros(int(len(content) / factor) + window_size)
+    for i in np.arange(0, len(content) - (window_size + h), h * factor):
+        first_spectra = np.fft.fft(hanning_window * content[int(i):int(i) + window_size])
+        second_spectra = np.fft.fft(hanning_window * content[int(i + h):int(i + h) + window_size])
+        phase = (phase + np.angle(second_spectra) - np.angle(first_spectra)) % (2 * np.pi)
+        second_spectra_rephased = np.fft.ifft(np.abs(second_spectra) * np.exp(1j * phase))
+        i2 = int(i / factor)
+        result[i2: i2 + window_size] += hanning_window * second_spectra_rephased.real
+    return result
+
+
+class PhaseVocoder:
+    def __init__(self, factor, window_size, h, hops_in_batch=16):
+        self.factor = factor
+        self.window_size = window_size
+        self.h = h
+        self.hops_in_batch = hops_in_batch
+        self.hanning_window = np.hanning(window_size)
+        self.phasor = np.ones(window_size // 2 + 1, dtype=complex)
+        self.count_of_hops = 0
+        self.content = np.zeros(0)
+        self.content_offset = 0
+        self.result = np.zeros(0)
+        self.result_offset = 0
+
+    def get_position(self, count_of_hops):
+        return count_of_hops * (self.h * self.factor)
+
+    def get_length(self):
+        return self.content_offset + len(self.content)
+
+    def process(self, content):
+        self.content = np.concatenate((self.content, content))
+        results = []
+        last_hop = self.count_of_hops + self.hops_in_batch
+        while self.get_position(last_hop) < self.get_length() - (self.window_size + self.h):
+            results.append(self.process_hops(last_hop))
+            last_hop = self.count_of_hops + self.hops_in_batch
+        self.drop_processed_content()
+        return np.concatenate(results) if results else np.zeros(0)
+
+    def flush(self):
+        length = self.get_length()
+        count_of_hops = get_count_of_hops(length, self.window_size, self.h, self.factor)
+        results = []
+        while self.count_of_hops < count_of_hops:
+            results.append(self.process_hops(min(self.count_of_hops + self.hops_in_batch, count_of_hops)))
+        end = int(length / self.factor) + self.window_size
+        self.add_to_result(np.array([end]), np.zeros((1, 0)))
+        results.append(self.pop_result(end))
+        return np.concatenate(results)
+
+    def process_hops(self, last_hop):
+        positions = self.get_position(np.arange(self.count_of_hops, last_hop))
+        first_spectra, second_spectra = self.get_spectra_of_two_consecutive_windows(positions)
+        second_spectra_rephased = self.get_rephased_all_frequencies(first_spectra, second_spectra)
+        frames = np.fft.irfft(second_spectra_rephased, n=self.window_size, axis=1)
+        frames *= self.hanning_window
+        self.add_to_result((positions / self.factor).astype(np.int64), frames)
+        self.count_of_hops = last_hop
+        return self.pop_result(int(self.get_position(last_hop) / self.factor))
+
+    def get_spectra_of_two_consecutive_windows(self, positions):
+        first_starts = positions.astype(np.int64)
+        second_starts = (positions + self.h).astype(np.int64)
+        starts, indices = np.unique(np.concatenate((first_starts, second_starts)), return_inverse=True)
+        windows = sliding_window_view(self.content, self.window_size)[starts - self.content_offset]
+        windows *= self.hanning_window
+        spectra = np.fft.rfft(windows, axis=1)
+        return spectra[indices[:len(positions)]], spectra[indices[len(positions):]]
+
+    def get_phase_rotations(self, first_spectra, second_spectra):
+        products = second_spectra * first_spectra.conj()
+        rotations, magnitudes = get_unit_phasors(products)
+        is_silent = magnitudes == 0
+        if is_silent.any():
+            rotations[is_silent] = (get_unit_phasors(second_spectra[is_silent])[0] *
+                                    get_unit_phasors(first_spectra[is_silent])[0].conj())
+        return rotations, np.abs(second_spectra)
+
+    def get_rephased_all_frequencies(self, first_spectra, second_spectra):
+        rotations, magnitudes = self.get_phase_rotations(first_spectra, second_spectra)
+        phasors = np.cumprod(rotations, axis=0)
+        phasors *= self.phasor
+        self.phasor = get_unit_phasors(phasors[-1])[0]
+        phasors *= magnitudes
+        return phasors
+
+    def add_to_result(self, starts, frames):
+        end = starts[-1] + frames.shape[1] - self.result_offset
+        if end > len(self.result):
+            self.result = np.concatenate((self.result, np.zeros(end - len(self.result))))
+        for start, frame in zip(starts - self.result_offset, frames):
+            self.result[start:start + len(frame)] += frame
+
+    def pop_result(self, end):
+        result = self.result[:end - self.result_offset]
+        self.result = self.result[end - self.result_offset:]
+        self.result_offset = max(end, self.result_offset)
+        return result
+
+    def drop_processed_content(self):
+        count_of_dropped = int(self.get_position(self.count_of_hops)) - self.content_offset
+        if count_of_dropped > 0:
+            self.content = self.content[count_of_dropped:]
+            self.content_offset += count_of_dropped
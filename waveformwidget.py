@@ -0,0 +1,77 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.Qt import Qt
+
+
+class WaveformWidget(QWidget):
+    seeked = pyqtSignal(int)
+
+    def __init__(self, parent, peak_index, geometry):
+        super().__init__(parent)
+        self.peak_index = peak_index
+        self.start = 0
+        self.end = max(peak_index.nframes, 1)
+        self.position = 0
+        self.setGeometry(*geometry)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.show()
+
+    def set_view(self, start, end):
+        length = min(max(end - start, self.width()), max(self.peak_index.nframes, 1))
+        self.start = min(max(start, 0), max(self.peak_index.nframes - length, 0))
+        self.end = self.start + length
+        self.update()
+
+    def set_position(self, position):
+        if position != self.position:
+            self.position = position
+            self.update()
+
+    def get_frame_position(self, x):
+        return self.start + (self.end - self.start) * x // max(self.width(), 1)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.scrub(event.x())
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.LeftButton:
+            self.scrub(event.x())
+
+    def scrub(self, x):
+        position = min(max(self.get_frame_position(x), 0), self.peak_index.nframes)
+        self.set_position(position)
+        self.seeked.emit(position)
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if event.modifiers() & Qt.ShiftModifier:
+            shift = int((self.end - self.start) * 0.1 * steps)
+            self.set_view(self.start - shift, self.end - shift)
+            return
+        position = self.get_frame_position(event.x())
+        zoom = 2 ** -steps
+        self.set_view(int(position - (position - self.start) * zoom), int(position + (self.end - position) * zoom))
+
+    def paintEvent(self, event):
+        width = self.width()
+        lane_height = self.height() / self.peak_index.nchannels
+        minimums, maximums, rms = self.peak_index.get_columns(self.start, self.end, width)
+        painter = QPainter(self)
+        for channel in range(self.peak_index.nchannels):
+            middle = lane_height * (channel + 0.5)
+            half_height = lane_height / 2
+            painter.setPen(QColor(255, 255, 255, 160))
+            for x in range(width):
+                painter.drawLine(x, int(middle - maximums[x, channel] * half_height),
+                                 x, int(middle - minimums[x, channel] * half_height))
+            painter.setPen(QColor(255, 200, 0, 200))
+            for x in range(width):
+                painter.drawLine(x, int(middle - rms[x, channel] * half_height),
+                                 x, int(middle + rms[x, channel] * half_height))
+        if self.start <= self.position < self.end:
+            painter.setPen(QColor(255, 0, 0))
+            x = (self.position - self.start) * width // (self.end - self.start)
+            painter.drawLine(x, 0, x, self.height())
+        painter.end()
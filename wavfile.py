@@ -0,0 +1,159 @@
+import os
+import struct
+
+import numpy as np
+
+from sampleformat import sample_types, bytes_to_samples, samples_to_bytes
+
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+HEADER_SIZE = 44
+
+
+def get_new_file_name(file_name, prefix):
+    directory, file_name = os.path.split(file_name)
+    return os.path.join(directory, prefix + file_name)
+
+
+def get_split_file_names(file_name, count_of_files):
+    if count_of_files <= 2:
+        return [get_new_file_name(file_name, prefix) for prefix in ['first_splitting_', 'second_splitting_']]
+    return [get_new_file_name(file_name, 'splitting_{}_'.format(i + 1)) for i in range(count_of_files)]
+
+
+def get_header(nchannels, sampwidth, framerate, nframes):
+    data_size = nframes * nchannels * sampwidth
+    return struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_size + data_size % 2, b'WAVE',
+                       b'fmt ', 16, WAVE_FORMAT_PCM, nchannels, framerate, framerate * nchannels * sampwidth,
+                       nchannels * sampwidth, sampwidth * 8, b'data', data_size)
+
+
+class WavReader:
+    def __init__(self, file_name, mode='r'):
+        self.file_name = file_name
+        self.nchannels = None
+        self.sampwidth = None
+        self.framerate = None
+        self.nframes = None
+        self.data_offset = None
+        self.comptype = 'NONE'
+        self.compname = 'not compressed'
+        self.read_header()
+        self.data = None
+        if self.nframes:
+            self.data = np.memmap(file_name, dtype=np.uint8, mode=mode, offset=self.data_offset,
+                                  shape=(self.nframes, self.nchannels * self.sampwidth))
+
+    def read_header(self):
+        with open(self.file_name, 'rb') as file:
+            file_size = os.fstat(file.fileno()).st_size
+            riff_id, _, wave_id = struct.unpack('<4sI4s', file.read(12))
+            if riff_id != b'RIFF' or wave_id != b'WAVE':
+                raise ValueError('File {} is not a RIFF/WAVE file'.format(self.file_name))
+            while True:
+                chunk_header = file.read(8)
+                if len(chunk_header) < 8:
+                    raise ValueError('File {} has no data chunk'.format(self.file_name))
+                chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+                if chunk_id == b'data':
+                    if self.sampwidth is None:
+                        raise ValueError('Data chunk is before fmt chunk in {}'.format(self.file_name))
+                    self.data_offset = file.tell()
+                    data_size = min(chunk_size, file_size - self.data_offset)
+                    self.nframes = data_size // (self.nchannels * self.sampwidth)
+                    return
+                if chunk_id == b'fmt ':
+                    self.read_format(file.read(chunk_size))
+                else:
+                    file.seek(chunk_size, 1)
+                file.seek(chunk_size % 2, 1)
+
+    def read_format(self, chunk):
+        format_tag, self.nchannels, self.framerate, _, _, bits = struct.unpack('<HHIIHH', chunk[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE and len(chunk) >= 26:
+            format_tag = struct.unpack('<H', chunk[24:26])[0]
+        if format_tag != WAVE_FORMAT_PCM:
+            raise ValueError('Unsupported WAV format {} in {}'.format(format_tag, self.file_name))
+        self.sampwidth = (bits + 7) // 8
+
+    def get_raw(self, start=0, end=None):
+        if self.data is None:
+            return np.zeros((0, self.nchannels * self.sampwidth), dtype=np.uint8)
+        return self.data[start:end].view(np.ndarray)
+
+    def get_samples(self, start=0, end=None):
+        raw = self.get_raw(start, end)
+        if self.sampwidth == 3:
+            return bytes_to_samples(raw, self.sampwidth, self.nchannels)
+        return raw.view(sample_types[self.sampwidth])
+
+    def close(self):
+        self.data = None
+
+
+class WavWriter:
+    def __init__(self, file_name, nchannels, sampwidth, framerate, nframes):
+        self.file_name = file_name
+        self.temporary_file_name = file_name + '.part'
+        self.nchannels = nchannels
+        self.sampwidth = sampwidth
+        self.framerate = framerate
+        self.nframes = nframes
+        self.count_of_frames = 0
+        with open(self.temporary_file_name, 'wb') as file:
+            file.write(get_header(nchannels, sampwidth, framerate, nframes))
+            file.truncate(HEADER_SIZE + nframes * nchannels * sampwidth + nframes * nchannels * sampwidth % 2)
+        self.data = None
+        if nframes:
+            self.data = np.memmap(self.temporary_file_name, dtype=np.uint8, mode='r+', offset=HEADER_SIZE,
+                                  shape=(nframes, nchannels * sampwidth))
+
+    @property
+    def samples(self):
+        if self.sampwidth == 3:
+            raise ValueError('24-bit samples can not be mapped, use write')
+        self.count_of_frames = self.nframes
+        return self.data.view(sample_types[self.sampwidth])
+
+    def write(self, position, samples):
+        if position + len(samples) > self.nframes:
+            raise ValueError('Writing after the end of preallocated file {}'.format(self.file_name))
+        if not len(samples):
+            return
+        if self.sampwidth == 3:
+            raw = np.frombuffer(samples_to_bytes(samples, self.sampwidth), dtype=np.uint8)
+            self.data[position:position + len(samples)] = raw.reshape(len(samples), -1)
+        else:
+            self.data.view(sample_types[self.sampwidth])[position:position + len(samples)] = samples
+        self.count_of_frames = max(self.count_of_frames, position + len(samples))
+
+    def close(self):
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+        if self.count_of_frames < self.nframes:
+            data_size = self.count_of_frames * self.nchannels * self.sampwidth
+            with open(self.temporary_file_name, 'r+b') as file:
+                file.write(get_header(self.nchannels, self.sampwidth, self.framerate, self.count_of_frames))
+                file.seek(HEADER_SIZE + data_size)
+                file.write(b'\x00' * (data_size % 2))
+                file.truncate()
+        os.replace(self.temporary_file_name, self.file_name)
+
+
+class WavUpdater(WavWriter):
+    def __init__(self, file_name):
+        wav = WavReader(file_name, 'r+')
+        self.file_name = file_name
+        self.nchannels = wav.nchannels
+        self.sampwidth = wav.sampwidth
+        self.framerate = wav.framerate
+        self.nframes = wav.nframes
+        self.count_of_frames = wav.nframes
+        self.data = wav.data
+
+    def close(self):
+        if self.data is not None:
+            self.data.flush()
+            self.data = None